@@ -0,0 +1,37 @@
+"""Per-team lineup optimizer solve time on synthetic leagues.
+
+Run from the repo root: python -m benchmarks.bench_lineup [leagues] [teams]
+"""
+import random, sys, time
+import datetime as dt
+import numpy as np
+from libs.schedule_matrix import GameMatrix, back_to_backs
+from engine.lineup import optimize_lineup
+
+POSITIONS = ["C", "C", "C,LW", "LW", "LW,RW", "RW", "RW", "C,RW", "D", "D", "D", "D", "D", "G", "G", "G"]
+ROSTER_POSITIONS = {"C": 2, "LW": 2, "RW": 2, "D": 4, "Util": 1, "G": 2, "BN": 4, "IR": 1}
+
+def synthetic_league(teams: int, nhl_teams: list, rng: random.Random):
+    return [[{"name": f"t{t}p{i}", "position": rng.choice(POSITIONS), "nhl_team": rng.choice(nhl_teams),
+              "status": "active"} for i in range(16)] for t in range(teams)]
+
+def main(leagues: int = 20, teams: int = 12):
+    rng = random.Random(7)
+    nhl_teams = [f"T{i:02d}" for i in range(32)]
+    games = np.random.default_rng(7).random((32, 8)) < 0.45
+    schedule = GameMatrix(nhl_teams, dt.date.today(), games, back_to_backs(games))
+    
+    timings = []
+    for _ in range(leagues):
+        for roster in synthetic_league(teams, nhl_teams, rng):
+            started = time.perf_counter()
+            optimize_lineup(roster, schedule, ROSTER_POSITIONS)
+            timings.append((time.perf_counter() - started) * 1000)
+    
+    timings.sort()
+    print(f"lineup solves: {len(timings)} teams x {schedule.days} days")
+    print(f"mean {np.mean(timings):.3f} ms  p50 {timings[len(timings) // 2]:.3f} ms  "
+          f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms  max {timings[-1]:.3f} ms")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
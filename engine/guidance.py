@@ -1,97 +1,157 @@
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Hashable, Optional, Tuple, Union
 import datetime as dt
-from collections import defaultdict
+import numpy as np
+from libs.schedule_matrix import GameMatrix
+from engine.lineup import optimize_lineup
 
 THRESHOLDS = {"skater_gp": 8, "goalie_gs": 5}
 
-def compute_guidance(roster: List[Dict[str, Any]], schedule: List[Dict[str, Any]],
+def compute_guidance(roster: List[Dict[str, Any]], schedule: Union[GameMatrix, List[Dict[str, Any]]],
                      current_splits: Dict[str, Any], last_splits: Dict[str, Any],
                      current_season: str, last_season: str, league_settings: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-    """Compute fantasy guidance based on roster, schedule, and league scoring settings"""
-    items = []
+    """Compute fantasy guidance based on roster, schedule, and league scoring settings.
+    
+    The schedule is a team-by-day GameMatrix for the target window; a list of
+    NHL game dicts is still accepted and converted.
+    """
+    return compute_league_guidance({0: roster}, schedule, current_season, last_season, league_settings)[0]
+
+def compute_league_guidance(rosters: Dict[Hashable, List[Dict[str, Any]]],
+                            schedule: Union[GameMatrix, List[Dict[str, Any]]],
+                            current_season: str, last_season: str,
+                            league_settings: Dict[str, Any] = None,
+                            outlooks: Optional[Dict[Hashable, Dict[str, Any]]] = None) -> Dict[Hashable, List[Dict[str, Any]]]:
+    """Compute guidance for many rosters in one vectorized pass.
+    
+    rosters maps any key (team id, or (league id, team id) across leagues) to a
+    player list; the result maps the same keys to compute_guidance items.
+    outlooks optionally maps keys to engine.outlook.roster_outlook results.
+    """
+    if not isinstance(schedule, GameMatrix):
+        schedule = GameMatrix.from_games(schedule)
     
     # Extract scoring categories from league settings
     scoring_categories = []
     if league_settings and "categories" in league_settings:
         scoring_categories = list(league_settings["categories"].keys())
+    scoring_reason = _scoring_reason(scoring_categories)
     
-    # Group players by position
-    players_by_pos = defaultdict(list)
-    for player in roster:
-        if player.get("status") == "active":
-            pos = player.get("position", "UNKNOWN")
-            players_by_pos[pos].append(player)
+    # Games and B2B games per NHL team, summed once for the whole window
+    games_per_row = schedule.games.sum(axis=1)
+    b2b_per_row = schedule.b2b.sum(axis=1)
     
-    # For each position, analyze game volume and make recommendations
-    for position, players in players_by_pos.items():
-        if len(players) < 2:  # Need at least 2 players to make start/bench decisions
-            continue
-            
-        # Count games for each player in the target week
-        player_games = {}
-        for player in players:
+    # Flatten active players with a known NHL team; a group is one position of one roster,
+    # numbered in roster order and then in order of first appearance within the roster
+    keys = list(rosters)
+    groups: Dict[Tuple[int, str], int] = {}
+    names, group_ids, nhl_teams = [], [], []
+    for key_idx, key in enumerate(keys):
+        for player in rosters[key]:
+            if player.get("status") != "active":
+                continue
+            group = groups.setdefault((key_idx, player.get("position", "UNKNOWN")), len(groups))
             nhl_team = player.get("nhl_team", "UNK")
             if nhl_team != "UNK":
-                # Count games for this player's NHL team
-                team_games = [g for g in schedule if g.get("homeTeam", {}).get("abbrev") == nhl_team or 
-                            g.get("awayTeam", {}).get("abbrev") == nhl_team]
-                player_games[player["name"]] = {
-                    "games": len(team_games),
-                    "b2b_games": sum(1 for g in team_games if g.get("backToBack", False)),
-                    "nhl_team": nhl_team
-                }
-        
-        # Sort by game count (descending)
-        sorted_players = sorted(player_games.items(), key=lambda x: x[1]["games"], reverse=True)
-        
-        if len(sorted_players) >= 2:
-            # Recommend starting players with more games
-            for i in range(len(sorted_players) - 1):
-                player_in = sorted_players[i]
-                player_out = sorted_players[i + 1]
-                
-                if player_in[1]["games"] > player_out[1]["games"]:
-                    reason_parts = [f"{player_in[1]['games']} games vs {player_out[1]['games']}"]
-                    
-                    if player_in[1]["b2b_games"] > 0:
-                        reason_parts.append(f"B2B games: {player_in[1]['b2b_games']}")
-                    
-                    # Add scoring-specific insights
-                    if scoring_categories:
-                        if "G" in scoring_categories and "A" in scoring_categories:
-                            reason_parts.append("More games = more scoring opportunities")
-                        elif "SOG" in scoring_categories:
-                            reason_parts.append("More games = more shots on goal")
-                        elif "HIT" in scoring_categories:
-                            reason_parts.append("More games = more hits")
-                        elif "BLK" in scoring_categories:
-                            reason_parts.append("More games = more blocks")
-                    
-                    reason = "; ".join(reason_parts)
-                    
-                    items.append({
-                        "type": "start_bench",
-                        "playerIn": player_in[0],
-                        "playerOut": player_out[0],
-                        "reason": reason,
-                        "sourceSeason": current_season,
-                        "fallbackReason": None
-                    })
+                names.append(player["name"])
+                group_ids.append(group)
+                nhl_teams.append(nhl_team)
+    
+    rows = schedule.rows(nhl_teams)
+    known = rows >= 0
+    # Index only known rows: the matrix may have no rows at all (e.g. an empty game list)
+    games = np.zeros(len(rows), dtype=np.int64)
+    b2b_games = np.zeros(len(rows), dtype=np.int64)
+    games[known] = games_per_row[rows[known]]
+    b2b_games[known] = b2b_per_row[rows[known]]
+    group_ids = np.asarray(group_ids, dtype=np.intp)
+    group_keys = np.array([key_idx for key_idx, _ in groups], dtype=np.intp)
     
-    # Add general schedule insights
-    total_games = len(schedule)
-    b2b_games = sum(1 for g in schedule if g.get("backToBack", False))
+    # Sort by group, then game count descending (stable, so ties keep roster order),
+    # and recommend each player over the next one in the same group with fewer games
+    order = np.lexsort((-games, group_ids))
+    first, second = order[:-1], order[1:]
+    pairs = (group_ids[first] == group_ids[second]) & (games[first] > games[second])
     
-    if b2b_games > 0:
-        items.append({
-            "type": "schedule_insight",
-            "message": f"Week has {total_games} total games with {b2b_games} back-to-back games",
+    results: Dict[Hashable, List[Dict[str, Any]]] = {key: [] for key in keys}
+    for i, j in zip(first[pairs], second[pairs]):
+        reason_parts = [f"{games[i]} games vs {games[j]}"]
+        if b2b_games[i] > 0:
+            reason_parts.append(f"B2B games: {b2b_games[i]}")
+        if scoring_reason:
+            reason_parts.append(scoring_reason)
+        
+        results[keys[group_keys[group_ids[i]]]].append({
+            "type": "start_bench",
+            "playerIn": names[i],
+            "playerOut": names[j],
+            "reason": "; ".join(reason_parts),
             "sourceSeason": current_season,
             "fallbackReason": None
         })
     
-    return items
+    # Add lineup and general schedule insights (games played by each roster's NHL teams)
+    roster_positions = (league_settings or {}).get("rosterPositions")
+    for key in keys:
+        lineup = optimize_lineup(rosters[key], schedule, roster_positions)
+        if lineup["benchedGames"] > 0:
+            most_benched = sorted(((stats["games"] - stats["starts"], name)
+                                   for name, stats in lineup["players"].items()
+                                   if stats["games"] > stats["starts"]), key=lambda x: -x[0])[:3]
+            benched = ", ".join(f"{name} {lost}" for lost, name in most_benched)
+            results[key].append({
+                "type": "lineup",
+                "message": f"Best daily lineups start {lineup['totalStarts']} of {lineup['totalGames']} games; "
+                           f"{lineup['benchedGames']} stay on the bench ({benched})",
+                "starts": lineup["totalStarts"],
+                "games": lineup["totalGames"],
+                "sourceSeason": current_season,
+                "fallbackReason": None
+            })
+        
+        team_rows = schedule.rows(sorted({p.get("nhl_team", "UNK") for p in rosters[key]} - {"UNK"}))
+        team_rows = team_rows[team_rows >= 0]
+        total_games = int(games_per_row[team_rows].sum())
+        b2b_total = int(b2b_per_row[team_rows].sum())
+        
+        if b2b_total > 0:
+            results[key].append({
+                "type": "schedule_insight",
+                "message": f"Week has {total_games} total games with {b2b_total} back-to-back games",
+                "sourceSeason": current_season,
+                "fallbackReason": None
+            })
+        
+        outlook = (outlooks or {}).get(key)
+        if outlook:
+            results[key].append(_outlook_item(outlook, current_season))
+    
+    return results
+
+def _outlook_item(outlook: Dict[str, Any], current_season: str) -> Dict[str, Any]:
+    parts = []
+    for label, strength in (("Rest of season", outlook["restOfSeason"]), ("Playoffs", outlook.get("playoffs"))):
+        if strength:
+            relative = f" ({strength['strength']:.0%} of an average schedule)" if strength["strength"] else ""
+            parts.append(f"{label}: {strength['games']} games{relative}")
+    return {
+        "type": "outlook",
+        "message": "; ".join(parts),
+        "sourceSeason": current_season,
+        "fallbackReason": None
+    }
+
+def _scoring_reason(scoring_categories: List[str]) -> str:
+    """Scoring-specific insight appended to start/bench reasons"""
+    if "G" in scoring_categories and "A" in scoring_categories:
+        return "More games = more scoring opportunities"
+    elif "SOG" in scoring_categories:
+        return "More games = more shots on goal"
+    elif "HIT" in scoring_categories:
+        return "More games = more hits"
+    elif "BLK" in scoring_categories:
+        return "More games = more blocks"
+    return ""
 
 def tl_dr(items: List[Dict[str, Any]]) -> List[str]:
     """Generate TL;DR bullets from guidance items"""
@@ -99,6 +159,6 @@ def tl_dr(items: List[Dict[str, Any]]) -> List[str]:
     for item in items:
         if item["type"] == "start_bench":
             bullets.append(f"Start {item['playerIn']} over {item['playerOut']} ({item['reason']})")
-        elif item["type"] == "schedule_insight":
+        elif item["type"] in ("schedule_insight", "lineup", "outlook"):
             bullets.append(item["message"])
     return bullets
@@ -0,0 +1,77 @@
+from typing import List, Dict, Any, Optional
+import numpy as np
+from libs.schedule_matrix import GameMatrix
+
+# Standard Yahoo NHL lineup, used when a league's roster positions are unknown
+DEFAULT_ROSTER_POSITIONS = {"C": 2, "LW": 2, "RW": 2, "D": 4, "Util": 1, "G": 2}
+# Roster spots that never start
+NON_STARTING_SLOTS = {"BN", "IR", "IR+", "NA"}
+# Flex slots and the positions they accept
+FLEX_SLOTS = {"Util": {"C", "LW", "RW", "D"}, "F": {"C", "LW", "RW"}, "W": {"LW", "RW"}}
+
+def starting_slots(roster_positions: Optional[Dict[str, int]] = None) -> List[str]:
+    """One entry per starting lineup slot, e.g. ["C", "C", "LW", ...]"""
+    positions = roster_positions or DEFAULT_ROSTER_POSITIONS
+    return [slot for slot, count in positions.items() if slot not in NON_STARTING_SLOTS
+            for _ in range(int(count))]
+
+def _eligible(position: str, slots: List[str]) -> List[int]:
+    """Slot indexes a player with a display position like "C,LW" can fill"""
+    positions = {p.strip() for p in position.split(",")}
+    return [i for i, slot in enumerate(slots) if slot in positions or positions & FLEX_SLOTS.get(slot, set())]
+
+def _assign_day(players: List[int], eligible: List[List[int]], n_slots: int) -> List[int]:
+    """Maximum bipartite matching of the day's players to slots; returns the player per slot (-1 if empty)"""
+    slot_owner = [-1] * n_slots
+    
+    def _augment(player: int, seen: List[bool]) -> bool:
+        for slot in eligible[player]:
+            if not seen[slot]:
+                seen[slot] = True
+                if slot_owner[slot] == -1 or _augment(slot_owner[slot], seen):
+                    slot_owner[slot] = player
+                    return True
+        return False
+    
+    # Least flexible players first keeps augmenting paths short
+    for player in sorted(players, key=lambda p: len(eligible[p])):
+        _augment(player, [False] * n_slots)
+    return slot_owner
+
+def optimize_lineup(roster: List[Dict[str, Any]], schedule: GameMatrix,
+                    roster_positions: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Assign players to the league's lineup slots day by day to maximize games started.
+    
+    Lineups are set daily, so solving each day's assignment optimally maximizes
+    starts over the whole window. Only active players with a known NHL team count.
+    """
+    slots = starting_slots(roster_positions)
+    players = [p for p in roster if p.get("status") == "active" and p.get("nhl_team", "UNK") != "UNK"]
+    eligible = [_eligible(p.get("position", ""), slots) for p in players]
+    
+    rows = schedule.rows([p["nhl_team"] for p in players])
+    plays = np.zeros((len(players), schedule.days), dtype=bool)
+    plays[rows >= 0] = schedule.games[rows[rows >= 0]]
+    
+    starts = np.zeros(len(players), dtype=int)
+    days = []
+    for day, date in enumerate(schedule.dates()):
+        playing = np.flatnonzero(plays[:, day]).tolist()
+        slot_owner = _assign_day(playing, eligible, len(slots))
+        started = {p for p in slot_owner if p != -1}
+        starts[list(started)] += 1
+        days.append({
+            "date": date.isoformat(),
+            "lineup": [{"slot": slot, "player": players[p]["name"]}
+                       for slot, p in zip(slots, slot_owner) if p != -1],
+            "bench": [players[p]["name"] for p in playing if p not in started]
+        })
+    
+    games = plays.sum(axis=1)
+    return {
+        "totalGames": int(games.sum()),
+        "totalStarts": int(starts.sum()),
+        "benchedGames": int(games.sum() - starts.sum()),
+        "players": {p["name"]: {"games": int(g), "starts": int(s)} for p, g, s in zip(players, games, starts)},
+        "days": days
+    }
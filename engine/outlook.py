@@ -0,0 +1,62 @@
+from typing import List, Dict, Any, Optional, Tuple
+import datetime as dt
+import numpy as np
+from libs.schedule_matrix import GameMatrix
+
+def week_dates(league_settings: Dict[str, Any], week: int) -> Optional[Tuple[dt.date, dt.date]]:
+    """Monday..Sunday of a fantasy week, clipped to the league's start and end dates"""
+    if not league_settings.get("startDate"):
+        return None
+    season_start = dt.date.fromisoformat(league_settings["startDate"])
+    first_monday = season_start - dt.timedelta(days=season_start.weekday())
+    monday = first_monday + dt.timedelta(weeks=week - league_settings.get("startWeek", 1))
+    start, end = max(monday, season_start), monday + dt.timedelta(days=6)
+    if league_settings.get("endDate"):
+        end = min(end, dt.date.fromisoformat(league_settings["endDate"]))
+    return start, end
+
+def playoff_window(league_settings: Dict[str, Any]) -> Optional[Tuple[dt.date, dt.date]]:
+    """First and last day of the fantasy playoffs, if the league calendar is known"""
+    if not league_settings.get("playoffStartWeek") or not league_settings.get("endWeek"):
+        return None
+    first = week_dates(league_settings, league_settings["playoffStartWeek"])
+    last = week_dates(league_settings, league_settings["endWeek"])
+    return (first[0], last[1]) if first and last else None
+
+def schedule_strength(players: List[Dict[str, Any]], schedule: GameMatrix,
+                      start: dt.date, end: dt.date) -> Dict[str, Any]:
+    """Games and B2B games of a roster's active players between start and end (inclusive).
+    
+    strength compares the roster's games to an average NHL team's games over the
+    same dates (1.0 = average). Counts come from the matrix prefix sums.
+    """
+    players = [p for p in players if p.get("status") == "active" and p.get("nhl_team", "UNK") != "UNK"]
+    games, b2b = schedule.counts(start, end)
+    
+    # Average over teams that have a schedule at all this season
+    scheduled = schedule.prefix_sums()[0][:, -1] > 0
+    league_average = float(games[scheduled].mean()) if scheduled.any() else 0.0
+    
+    rows = schedule.rows([p["nhl_team"] for p in players])
+    player_games = np.where(rows >= 0, games[rows], 0)
+    player_b2b = np.where(rows >= 0, b2b[rows], 0)
+    total = int(player_games.sum())
+    
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "games": total,
+        "b2bGames": int(player_b2b.sum()),
+        "strength": round(total / (len(players) * league_average), 3) if players and league_average else None,
+        "players": {p["name"]: {"games": int(g), "b2bGames": int(b)}
+                    for p, g, b in zip(players, player_games, player_b2b)}
+    }
+
+def roster_outlook(players: List[Dict[str, Any]], schedule: GameMatrix, from_date: dt.date,
+                   league_settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Rest-of-season (from_date to the season's last game) and fantasy playoff schedule strength"""
+    window = playoff_window(league_settings or {})
+    return {
+        "restOfSeason": schedule_strength(players, schedule, from_date, schedule.end),
+        "playoffs": schedule_strength(players, schedule, *window) if window else None
+    }
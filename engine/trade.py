@@ -0,0 +1,37 @@
+from typing import List, Dict, Any, Optional
+from libs.schedule_matrix import GameMatrix
+from engine.lineup import optimize_lineup
+
+def swap_players(roster: List[Dict[str, Any]], outgoing: List[str],
+                 incoming: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Roster after sending away the outgoing player ids and receiving the incoming players"""
+    return [p for p in roster if str(p.get("player_id")) not in outgoing] + incoming
+
+def _side(before: List[Dict[str, Any]], after: List[Dict[str, Any]], schedule: GameMatrix,
+          roster_positions: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    lineup_before = optimize_lineup(before, schedule, roster_positions)
+    lineup_after = optimize_lineup(after, schedule, roster_positions)
+    return {
+        "startsBefore": lineup_before["totalStarts"],
+        "startsAfter": lineup_after["totalStarts"],
+        "startsDelta": lineup_after["totalStarts"] - lineup_before["totalStarts"],
+        "gamesBefore": lineup_before["totalGames"],
+        "gamesAfter": lineup_after["totalGames"]
+    }
+
+def analyze_trade(roster_a: List[Dict[str, Any]], roster_b: List[Dict[str, Any]],
+                  give: List[str], get: List[str], schedule: GameMatrix,
+                  roster_positions: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Games-started change for both teams when team A sends `give` for team B's `get`.
+    
+    Starts come from the daily lineup optimizer over the schedule window, so
+    lineup slot limits and multi-position eligibility are respected.
+    """
+    give, get = [str(p) for p in give], [str(p) for p in get]
+    outgoing_a = [p for p in roster_a if str(p.get("player_id")) in give]
+    outgoing_b = [p for p in roster_b if str(p.get("player_id")) in get]
+    
+    return {
+        "teamA": _side(roster_a, swap_players(roster_a, give, outgoing_b), schedule, roster_positions),
+        "teamB": _side(roster_b, swap_players(roster_b, get, outgoing_a), schedule, roster_positions)
+    }
@@ -4,7 +4,9 @@ import os
 from azure.keyvault.secrets import SecretClient
 from azure.identity import DefaultAzureCredential
 from libs import cosmos
+from libs.cosmos_metrics import track_cosmos
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
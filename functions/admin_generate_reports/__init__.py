@@ -2,10 +2,13 @@ import azure.functions as func
 import json
 import os
 import datetime as dt
-from libs import cosmos
-from libs.yahoo_client import YahooClient
-from libs.nhl_client import fetch_schedule, season_code
+from libs import cosmos, roster_store
+from libs.cosmos_metrics import track_cosmos
+from libs.branding import current_logo_url
+from libs.yahoo_client import YahooClient, configure_rate_limit
+from libs.nhl_client import fetch_schedule, schedule_matrix, season_schedule, season_code
 from engine.guidance import compute_guidance, tl_dr
+from engine.outlook import roster_outlook, week_dates
 from engine.llm import rewrite
 from jinja2 import Template
 import base64
@@ -16,6 +19,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
@@ -40,7 +44,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return func.HttpResponse("Missing leagueId", status_code=400)
         
         # Get league information
-        league_doc = cosmos.get("leagues", f"league-{league_id}", partition=league_id)
+        league_doc = cosmos.get_by_id("leagues", f"league-{league_id}", partition=league_id)
         if not league_doc:
             return func.HttpResponse("League not found", status_code=404)
         
@@ -51,11 +55,25 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return func.HttpResponse("No managers found for this league", status_code=404)
         
         # Initialize Yahoo client
-        yahoo_client = YahooClient()
+        configure_rate_limit()
+        yahoo_client = YahooClient(league_id)
+        teams = yahoo_client.teams()
+        league_settings = league_doc.get("settings", {})
         
-        # Get league data
-        league_data = yahoo_client.get_league(league_id)
-        teams = league_data.get('teams', [])
+        # Stored rosters for the whole league in one single-partition query; guidance needs them too
+        league_rosters = roster_store.load_league_rosters(league_id, week) \
+            if include_rosters or include_guidance else {}
+        
+        # The fantasy week's dates, or the coming seven days when the league calendar is unknown
+        today = dt.date.today()
+        week_start, week_end = week_dates(league_settings, week) or (today, today + dt.timedelta(days=6))
+        current_season = season_code(week_start)
+        last_season = f"{int(current_season[:4])-1}{current_season[:4]}"
+        nhl_teams = {player.get("nhl_team", "UNK") for roster in league_rosters.values() for player in roster}
+        week_schedule = schedule_matrix(week_start, week_end, nhl_teams)
+        
+        # Whole-season schedule with prefix sums for rest-of-season/playoff outlooks
+        season = season_schedule(season_code(today))
         
         # Generate reports for each team
         reports = []
@@ -74,19 +92,24 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 manager_email = manager.get('email', '') if manager else ''
                 
                 # Get team roster
-                roster = yahoo_client.get_roster(league_id, team_id, week) if include_rosters else []
+                roster = league_rosters.get(str(team_id), [])
                 
-                # Get NHL schedule for the week
-                schedule = fetch_schedule(week) if include_schedule else []
+                # NHL games of the roster's teams this week
+                schedule = team_week_games(roster, week_start, week_end) if include_schedule else []
                 
                 # Generate guidance for this team
                 guidance = []
                 if include_guidance:
                     try:
-                        guidance = compute_guidance(league_id, team_id, week)
+                        items = compute_guidance(roster, week_schedule, {}, {}, current_season, last_season,
+                                                 league_settings)
+                        guidance = [{"message": bullet} for bullet in tl_dr(items)]
                     except Exception as e:
                         guidance = [{"type": "error", "message": f"Guidance generation failed: {str(e)}"}]
                 
+                # Rest-of-season and playoff schedule strength
+                outlook = roster_outlook(roster, season, today, league_settings) if roster else None
+                
                 # Create team report
                 team_report = {
                     "team_id": team_id,
@@ -97,7 +120,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     "roster": roster if include_rosters else [],
                     "schedule": schedule if include_schedule else [],
                     "guidance": guidance if include_guidance else [],
-                    "league_name": league_data.get('name', f"League {league_id}"),
+                    "outlook": outlook,
+                    "league_name": f"League {league_id}",
                     "generated_at": dt.datetime.now().isoformat()
                 }
                 
@@ -115,14 +139,16 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 })
         
         # Get the current logo
-        logo_url = get_current_logo()
+        logo_url = current_logo_url()
+        
+        report_id = f"report-{league_id}-{week}-{int(dt.datetime.now().timestamp())}"
         
         # Generate report content based on format
         if format_type == "pdf":
             # Generate PDF report
             pdf_content = generate_pdf_report(reports, title, league_id, week, logo_url)
             report_doc = {
-                "id": f"report-{league_id}-{week}-{int(dt.datetime.now().timestamp())}",
+                "id": report_id,
                 "leagueId": league_id,
                 "week": week,
                 "title": title,
@@ -137,7 +163,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             # Generate HTML report
             html_content = generate_html_report(reports, title, league_id, week, logo_url)
             report_doc = {
-                "id": f"report-{league_id}-{week}-{int(dt.datetime.now().timestamp())}",
+                "id": report_id,
                 "leagueId": league_id,
                 "week": week,
                 "title": title,
@@ -167,15 +193,18 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "error": f"Report generation failed: {str(e)}"
         }), status_code=500, mimetype="application/json")
 
-def get_current_logo():
-    """Get the most recent logo from storage"""
-    try:
-        logos = cosmos.query("logos", "SELECT * FROM c ORDER BY c.uploadedAt DESC")
-        if logos:
-            return logos[0].get("blobUrl", "")
-    except:
-        pass
-    return ""
+def team_week_games(roster, start, end):
+    """Games of the roster's NHL teams between start and end, in the report's table format"""
+    games = {}
+    for team_code in sorted({player.get("nhl_team", "UNK") for player in roster} - {"UNK"}):
+        for game in fetch_schedule(team_code, start, end):
+            games[game.get("gameId", game.get("id"))] = {
+                "date": game["gameDate"],
+                "home_team": game["homeTeam"]["abbrev"],
+                "away_team": game["awayTeam"]["abbrev"],
+                "time": game.get("startTimeUTC", "")
+            }
+    return sorted(games.values(), key=lambda game: game["date"])
 
 def generate_pdf_report(reports, title, league_id, week, logo_url):
     """Generate PDF report with professional formatting"""
@@ -378,6 +407,18 @@ def generate_html_report(reports, title, league_id, week, logo_url):
             </div>
             {% endif %}
             
+            {% if report.outlook %}
+            <div class="schedule">
+                <h3>📈 Schedule Outlook</h3>
+                <p><strong>Rest of season:</strong> {{ report.outlook.restOfSeason.games }} games
+                {% if report.outlook.restOfSeason.strength %}({{ (report.outlook.restOfSeason.strength * 100) | round | int }}% of an average schedule){% endif %}</p>
+                {% if report.outlook.playoffs %}
+                <p><strong>Playoffs:</strong> {{ report.outlook.playoffs.games }} games
+                {% if report.outlook.playoffs.strength %}({{ (report.outlook.playoffs.strength * 100) | round | int }}% of an average schedule){% endif %}</p>
+                {% endif %}
+            </div>
+            {% endif %}
+            
             {% if report.guidance %}
             <div class="guidance">
                 <h3>🎯 Fantasy Guidance</h3>
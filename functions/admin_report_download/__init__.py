@@ -2,7 +2,9 @@ import azure.functions as func
 import json
 import os
 from libs import cosmos
+from libs.cosmos_metrics import track_cosmos
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
@@ -17,7 +19,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         
         try:
             # Get report from Cosmos DB
-            report = cosmos.get("reports", report_id, partition=report_id.split('-')[1])  # Use league ID as partition
+            report = cosmos.get_by_id("reports", report_id, partition=report_id.split('-')[1])  # Use league ID as partition
             
             if not report:
                 return func.HttpResponse("Report not found", status_code=404)
@@ -2,7 +2,15 @@ import azure.functions as func
 import json
 import os
 from libs import cosmos
+from libs.cosmos_metrics import track_cosmos
 
+# Listing only needs metadata; never pull htmlContent/pdfContent
+REPORT_FIELDS = ["id", "title", "leagueId", "week", "format", "totalTeams",
+                 "generatedReports", "failedReports", "createdAt"]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
@@ -10,19 +18,36 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         return func.HttpResponse("Unauthorized: Admin role required", status_code=403)
     
     if req.method == "GET":
-        # List all reports
+        # List reports one page at a time (?pageSize=, ?leagueId=, continuation via x-continuation-token)
+        try:
+            page_size = int(req.params.get('pageSize', DEFAULT_PAGE_SIZE))
+            if page_size < 1:
+                raise ValueError
+        except ValueError:
+            return func.HttpResponse(json.dumps({
+                "error": "pageSize must be a positive integer"
+            }), status_code=400, mimetype="application/json")
+        page_size = min(page_size, MAX_PAGE_SIZE)
+        
         try:
-            reports = cosmos.query("reports", "SELECT * FROM c ORDER BY c.createdAt DESC")
+            league_id = req.params.get('leagueId')
+            continuation = req.headers.get('x-continuation-token') or req.params.get('continuation')
+            
+            pages = cosmos.query_pages("reports", "SELECT * FROM c ORDER BY c.createdAt DESC",
+                                       fields=REPORT_FIELDS, partition=league_id,
+                                       page_size=page_size, continuation=continuation)
+            reports, next_token = next(pages, ([], None))
             
             # Format reports for display
             formatted_reports = []
             for report in reports:
+                report = report.to_dict()
                 formatted_reports.append({
                     "id": report["id"],
                     "title": report.get("title", f"Report {report['id']}"),
                     "leagueId": report["leagueId"],
                     "week": report["week"],
-                    "totalTeams": report["totalTeams"],
+                    "totalTeams": report.get("totalTeams", 0),
                     "generatedReports": report.get("generatedReports", 0),
                     "failedReports": report.get("failedReports", 0),
                     "createdAt": report["createdAt"],
@@ -30,7 +55,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     "printUrl": f"/api/admin/reports/{report['id']}/print"
                 })
             
-            return func.HttpResponse(json.dumps(formatted_reports), status_code=200, mimetype="application/json")
+            headers = {"x-continuation-token": next_token} if next_token else None
+            return func.HttpResponse(json.dumps(formatted_reports), status_code=200, mimetype="application/json",
+                                     headers=headers)
             
         except Exception as e:
             return func.HttpResponse(json.dumps({
@@ -1,24 +1,17 @@
 import azure.functions as func
 import json, datetime as dt
 from libs.yahoo_client import YahooClient
-from libs.nhl_client import fetch_schedule, season_code
-from libs import cosmos
+from libs.nhl_client import schedule_matrix, season_code
+from libs import cosmos, roster_store
+from libs.cosmos_metrics import track_cosmos
+from libs.branding import current_logo_url
 from libs.gmail_client import send_gmail
 from engine.guidance import compute_guidance, tl_dr
 from engine.llm import rewrite
 from jinja2 import Template
 import os
 
-def get_current_logo():
-    """Get the most recent logo from storage"""
-    try:
-        logos = cosmos.query("logos", "SELECT * FROM c ORDER BY c.uploadedAt DESC")
-        if logos:
-            return logos[0].get("blobUrl", "")
-    except:
-        pass
-    return ""
-
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
@@ -55,20 +48,13 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         league_settings = league_doc.get("settings", {}) if league_doc else {}
         
         # Load roster
-        roster_doc = cosmos.get_by_id("rosters", f"roster-{team_id}-{week}", partition=team_id) or {"players":[]}
-        
-        # Build schedule for all players' NHL teams
-        schedule = []
-        for player in roster_doc["players"]:
-            nhl_team = player.get("nhl_team", "UNK")
-            if nhl_team != "UNK":
-                week_start = dt.date.today()
-                week_end = week_start + dt.timedelta(days=7)
-                team_schedule = fetch_schedule(nhl_team, week_start, week_end)
-                schedule.extend(team_schedule)
+        roster_doc = roster_store.get_roster(league_id, team_id, week) or {"players":[]}
         
-        # Remove duplicates
-        schedule = list({game.get("gameId", f"{game.get('homeTeam', {}).get('abbrev', '')}-{game.get('awayTeam', {}).get('abbrev', '')}-{game.get('gameDate', '')}"): game for game in schedule}.values())
+        # Build the team-by-day schedule matrix for the players' NHL teams
+        week_start = dt.date.today()
+        week_end = week_start + dt.timedelta(days=7)
+        schedule = schedule_matrix(week_start, week_end,
+                                   [player.get("nhl_team", "UNK") for player in roster_doc["players"]])
         
         # Compute guidance
         today = dt.date.today()
@@ -98,7 +84,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         insights = [item for item in items if item["type"] == "schedule_insight"]
         
         # Get current logo
-        logo_url = get_current_logo()
+        logo_url = current_logo_url()
         
         html = template.render(
             week=week,
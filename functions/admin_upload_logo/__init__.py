@@ -4,8 +4,10 @@ import os
 import uuid
 from datetime import datetime
 from azure.storage.blob import BlobServiceClient
-from libs import cosmos
+from libs.branding import set_current_logo
+from libs.cosmos_metrics import track_cosmos
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     # Check for admin role in headers (set by Azure Static Web Apps)
     user_roles = req.headers.get('x-ms-client-principal-roles', '')
@@ -60,7 +62,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         # Get the blob URL
         logo_url = blob_client.url
         
-        # Store logo metadata in Cosmos DB
+        # Store logo metadata in Cosmos DB and make it the current logo
         logo_doc = {
             "id": logo_id,
             "filename": file.filename,
@@ -70,7 +72,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "uploadedAt": datetime.now().isoformat()
         }
         
-        cosmos.upsert("logos", logo_doc, partition="default")
+        set_current_logo(logo_doc)
         
         # Return success response
         return func.HttpResponse(json.dumps({
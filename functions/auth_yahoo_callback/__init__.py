@@ -3,8 +3,10 @@ import os
 import requests
 import json
 from itsdangerous import URLSafeTimedSerializer
-from libs import cosmos
+from libs import cosmos, oauth_tokens
+from libs.cosmos_metrics import track_cosmos
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     code = req.params.get("code")
     state = req.params.get("state")
@@ -44,15 +46,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     
     tokens = response.json()
     
-    # Store tokens in Cosmos
-    token_doc = {
-        "id": "user-yahoo",
-        "provider": "yahoo",
-        "accessToken": tokens["access_token"],
-        "refreshToken": tokens.get("refresh_token"),
-        "expiresAt": tokens.get("expires_in", 3600)
-    }
-    
+    # Store tokens in Cosmos (expiresAt is absolute, in epoch seconds)
+    token_doc = oauth_tokens.token_doc("yahoo", tokens)
     cosmos.upsert("oauthTokens", token_doc, partition="yahoo")
+    oauth_tokens.yahoo.invalidate()
     
     return func.HttpResponse("Yahoo OAuth successful! You can now close this window.", status_code=200)
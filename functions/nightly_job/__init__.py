@@ -2,41 +2,58 @@
 import datetime, logging
 import azure.functions as func
 from libs import cosmos
-from libs.yahoo_client import YahooClient
-from libs.nhl_client import fetch_schedule, season_code
+from libs.cosmos_metrics import track_cosmos
+from libs.branding import current_logo_url
+from libs.yahoo_async import sync_leagues
+from libs.yahoo_client import configure_rate_limit
+from libs.nhl_client import schedule_matrix, season_schedule, season_code, prefetch_schedules
 from libs.gmail_client import send_gmail
-from engine.guidance import compute_guidance, tl_dr
+from libs import guidance_cache, roster_store, transport
+from engine.guidance import compute_league_guidance, tl_dr
+from engine.outlook import roster_outlook
 from engine.llm import rewrite
 from jinja2 import Template
 import os
 
-def get_current_logo():
-    """Get the most recent logo from storage"""
-    try:
-        logos = cosmos.query("logos", "SELECT * FROM c ORDER BY c.uploadedAt DESC")
-        if logos:
-            return logos[0].get("blobUrl", "")
-    except:
-        pass
-    return ""
-
+@track_cosmos
 def main(mytimer: func.TimerRequest) -> None:
     utc_timestamp = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
     logging.info(f"Nightly job executed at {utc_timestamp}")
     
+    configure_rate_limit()
+    # League and team documents are re-read per league and per team; serve repeats from memory,
+    # for this run only
+    with cosmos.read_cache():
+        run_nightly()
+
+def run_nightly() -> None:
+    cache_lookups = cache_hits = 0
     try:
+        # Warm the season's schedule cache before any league is processed
+        try:
+            timings = prefetch_schedules(season_code(datetime.date.today()))
+            failed = [code for code, timing in timings.items() if "error" in timing]
+            logging.info(f"Prefetched {len(timings) - len(failed)} schedules ({len(failed)} failed: {failed})")
+        except Exception as e:
+            logging.error(f"Schedule prefetch failed: {str(e)}")
+        
         # Get all configured leagues
         leagues = cosmos.query("leagues", "SELECT * FROM c")
         
+        # Pull every league's week, settings, teams and rosters from Yahoo concurrently
+        snapshots = sync_leagues([league_doc["leagueId"] for league_doc in leagues])
+        
         for league_doc in leagues:
             league_id = league_doc["leagueId"]
             logging.info(f"Processing league {league_id}")
             
             try:
                 # Sync league data
-                yc = YahooClient(league_id)
-                week = yc.current_week()
-                league_settings = yc.league_settings()
+                snapshot = snapshots[league_id]
+                if isinstance(snapshot, Exception):
+                    raise snapshot
+                week = snapshot["week"]
+                league_settings = snapshot["settings"]
                 
                 # Update league settings
                 league_doc["currentWeek"] = week
@@ -44,102 +61,105 @@ def main(mytimer: func.TimerRequest) -> None:
                 cosmos.upsert("leagues", league_doc, partition=league_id)
                 
                 # Get teams and sync rosters
-                teams = yc.teams()
+                teams = snapshot["teams"]
+                rosters = snapshot["rosters"]
+                team_docs = []
                 for team in teams:
                     team_id = team["team_id"]
                     
                     # Update team info
-                    cosmos.upsert("teams", {
+                    team_docs.append(({
                         "id": f"team-{team_id}",
                         "leagueId": league_id,
                         "teamId": team_id,
                         "name": team["name"],
                         "manager": team.get("manager", "")
-                    }, partition=league_id)
-                    
-                    # Get and store roster
-                    roster = yc.roster(team_id, week)
-                    cosmos.upsert("rosters", {
-                        "id": f"roster-{team_id}-{week}",
-                        "leagueId": league_id,
-                        "teamId": team_id,
-                        "week": week,
-                        "players": roster
-                    }, partition=team_id)
+                    }, league_id))
+                
+                for container, written in (("teams", cosmos.bulk_upsert("teams", team_docs)),
+                                           ("rosters", roster_store.save_league_rosters(league_id, week, rosters))):
+                    failed = [r["id"] for r in written["results"] if not r["ok"]]
+                    if failed:
+                        logging.error(f"Failed to store {container} {failed} for league {league_id}")
+                    logging.info(f"Stored {len(written['results']) - len(failed)} {container} for league {league_id} ({written['requestCharge']:.1f} RU)")
                 
                 # Process each team with a manager email
                 managers = cosmos.query("managers", 
                                       "SELECT * FROM c WHERE c.leagueId = @leagueId",
                                       [{"name": "@leagueId", "value": league_id}])
                 
+                # Fingerprint every managed team's inputs and reuse cached guidance where nothing changed
+                today = datetime.date.today()
+                current_season = season_code(today)
+                last_season = f"{int(current_season[:4])-1}{current_season[:4]}"
+                team_names = {t["team_id"]: t["name"] for t in teams}
+                managed_rosters = {m["teamId"]: rosters[m["teamId"]] for m in managers if m["teamId"] in rosters}
+                schedule = schedule_matrix(today, today + datetime.timedelta(days=7),
+                                           [player.get("nhl_team", "UNK")
+                                            for roster in managed_rosters.values() for player in roster])
+                logo_url = current_logo_url()
+                
+                # Rest-of-season and playoff outlook from the start of this week (stable all week)
+                season = season_schedule(current_season)
+                week_monday = today - datetime.timedelta(days=today.weekday())
+                outlooks = {team_id: roster_outlook(roster, season, week_monday, league_settings)
+                            for team_id, roster in managed_rosters.items()}
+                
+                fingerprints, cached_entries = {}, {}
+                for team_id, roster in managed_rosters.items():
+                    context = {"week": week, "teamName": team_names.get(team_id, f"Team {team_id}"),
+                               "logoUrl": logo_url, "season": current_season, "outlook": outlooks[team_id]}
+                    fingerprints[team_id] = guidance_cache.fingerprint(roster, schedule, league_settings, context)
+                    entry = guidance_cache.lookup(league_id, fingerprints[team_id])
+                    cache_lookups += 1
+                    if entry:
+                        cached_entries[team_id] = entry
+                        cache_hits += 1
+                
+                # Compute guidance for every cache miss in one batch
+                guidance_by_team = compute_league_guidance(
+                    {team_id: roster for team_id, roster in managed_rosters.items() if team_id not in cached_entries},
+                    schedule, current_season, last_season, league_settings, outlooks)
+                
+                template_path = os.path.join(os.path.dirname(__file__), "..", "..", "engine", "templates", "email.html.j2")
+                with open(template_path, 'r') as f:
+                    template = Template(f.read())
+                
                 for manager in managers:
                     team_id = manager["teamId"]
                     email = manager["email"]
                     
                     try:
-                        # Get team name
-                        team_doc = cosmos.get_by_id("teams", f"team-{team_id}", partition=league_id)
-                        team_name = team_doc.get("name", f"Team {team_id}") if team_doc else f"Team {team_id}"
-                        
-                        # Get roster
-                        roster_doc = cosmos.get_by_id("rosters", f"roster-{team_id}-{week}", partition=team_id)
-                        if not roster_doc:
+                        if team_id not in managed_rosters:
                             logging.warning(f"No roster found for team {team_id} in league {league_id}")
                             continue
+                        team_name = team_names.get(team_id, f"Team {team_id}")
                         
-                        # Build schedule
-                        schedule = []
-                        for player in roster_doc["players"]:
-                            nhl_team = player.get("nhl_team", "UNK")
-                            if nhl_team != "UNK":
-                                week_start = datetime.date.today()
-                                week_end = week_start + datetime.timedelta(days=7)
-                                team_schedule = fetch_schedule(nhl_team, week_start, week_end)
-                                schedule.extend(team_schedule)
-                        
-                        # Remove duplicates
-                        schedule = list({game.get("gameId", f"{game.get('homeTeam', {}).get('abbrev', '')}-{game.get('awayTeam', {}).get('abbrev', '')}-{game.get('gameDate', '')}"): game for game in schedule}.values())
-                        
-                        # Compute guidance
-                        today = datetime.date.today()
-                        current_season = season_code(today)
-                        last_season = f"{int(current_season[:4])-1}{current_season[:4]}"
-                        
-                        items = compute_guidance(
-                            roster_doc["players"],
-                            schedule,
-                            {},
-                            {},
-                            current_season,
-                            last_season,
-                            league_settings
-                        )
-                        
-                        bullets = tl_dr(items)
-                        pretty = rewrite(bullets)
-                        
-                        # Render email
-                        template_path = os.path.join(os.path.dirname(__file__), "..", "..", "engine", "templates", "email.html.j2")
-                        with open(template_path, 'r') as f:
-                            template = Template(f.read())
-                        
-                        recommendations = [item for item in items if item["type"] == "start_bench"]
-                        insights = [item for item in items if item["type"] == "schedule_insight"]
-                        
-                        # Get current logo
-                        logo_url = get_current_logo()
-                        
-                        html = template.render(
-                            week=week,
-                            team_name=team_name,
-                            tl_dr=pretty,
-                            recommendations=recommendations,
-                            insights=insights,
-                            source_season=current_season,
-                            fallback_reason=None,
-                            scoring_type=league_settings.get("type", "unknown"),
-                            logo_url=logo_url
-                        )
+                        entry = cached_entries.get(team_id)
+                        if entry:
+                            items, pretty, html = entry["items"], entry["tl_dr"], entry["html"]
+                        else:
+                            items = guidance_by_team[team_id]
+                            bullets = tl_dr(items)
+                            pretty = rewrite(bullets)
+                            
+                            # Render email
+                            recommendations = [item for item in items if item["type"] == "start_bench"]
+                            insights = [item for item in items if item["type"] == "schedule_insight"]
+                            
+                            html = template.render(
+                                week=week,
+                                team_name=team_name,
+                                tl_dr=pretty,
+                                recommendations=recommendations,
+                                insights=insights,
+                                source_season=current_season,
+                                fallback_reason=None,
+                                scoring_type=league_settings.get("type", "unknown"),
+                                logo_url=logo_url
+                            )
+                            guidance_cache.store(league_id, team_id, fingerprints[team_id],
+                                                 {"items": items, "tl_dr": pretty, "html": html})
                         
                         # Send email
                         subject = f"Fantasy NHL Guidance - Week {week} - {team_name}"
@@ -174,6 +194,10 @@ def main(mytimer: func.TimerRequest) -> None:
                 logging.error(f"Error processing league {league_id}: {str(e)}")
                 continue
         
+        hit_rate = f"{cache_hits / cache_lookups:.0%}" if cache_lookups else "n/a"
+        logging.info(f"Guidance cache: {cache_hits}/{cache_lookups} hits ({hit_rate})")
+        logging.info(f"Cosmos read cache: {cosmos.read_cache_stats()}")
+        logging.info(f"HTTP by host: {transport.stats()}")
         logging.info("Nightly job completed successfully")
         
     except Exception as e:
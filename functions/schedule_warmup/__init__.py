@@ -0,0 +1,30 @@
+import azure.functions as func
+import json, datetime as dt
+from libs.nhl_client import prefetch_schedules, season_code
+from libs.cosmos_metrics import track_cosmos
+
+@track_cosmos
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    # Check for admin role in headers (set by Azure Static Web Apps)
+    user_roles = req.headers.get('x-ms-client-principal-roles', '')
+    if 'admin' not in user_roles:
+        return func.HttpResponse("Unauthorized: Admin role required", status_code=403)
+    if req.method != "POST":
+        return func.HttpResponse("Method not allowed", status_code=405)
+    
+    season = req.params.get("season") or season_code(dt.date.today())
+    force = req.params.get("force", "").lower() in ("1", "true", "yes")
+    
+    try:
+        timings = prefetch_schedules(season, force=force)
+        failed = [code for code, timing in timings.items() if "error" in timing]
+        
+        return func.HttpResponse(json.dumps({
+            "season": season,
+            "fetched": len(timings) - len(failed),
+            "failed": failed,
+            "teams": timings
+        }), status_code=200, mimetype="application/json")
+        
+    except Exception as e:
+        return func.HttpResponse(f"Error: {str(e)}", status_code=500)
@@ -2,11 +2,13 @@
 import azure.functions as func
 import json, datetime as dt
 from libs.yahoo_client import YahooClient
-from libs.nhl_client import fetch_schedule, season_code, map_team_to_code
-from libs import cosmos
+from libs.nhl_client import schedule_matrix, season_code, map_team_to_code
+from libs import cosmos, roster_store
+from libs.cosmos_metrics import track_cosmos
 from engine.guidance import compute_guidance, tl_dr
 from engine.llm import rewrite
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     league_id = req.route_params.get("leagueId")
     team_id = req.params.get("teamId")
@@ -21,21 +23,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     league_settings = league_doc.get("settings", {}) if league_doc else {}
     
     # Load roster
-    roster_doc = cosmos.get_by_id("rosters", f"roster-{team_id}-{week}", partition=team_id) or {"players":[]}
+    roster_doc = roster_store.get_roster(league_id, team_id, week) or {"players":[]}
     
-    # Build schedule for all players' NHL teams
-    schedule = []
-    for player in roster_doc["players"]:
-        nhl_team = player.get("nhl_team", "UNK")
-        if nhl_team != "UNK":
-            # Get week start/end dates (simplified - you'd want to calculate actual week boundaries)
-            week_start = today
-            week_end = today + dt.timedelta(days=7)
-            team_schedule = fetch_schedule(nhl_team, week_start, week_end)
-            schedule.extend(team_schedule)
-    
-    # Remove duplicates
-    schedule = list({game["gameId"]: game for game in schedule}.values())
+    # Build the team-by-day schedule matrix for the players' NHL teams
+    # (simplified week - you'd want to calculate actual week boundaries)
+    schedule = schedule_matrix(today, today + dt.timedelta(days=7),
+                               [player.get("nhl_team", "UNK") for player in roster_doc["players"]])
     
     # Compute guidance with league settings
     items = compute_guidance(
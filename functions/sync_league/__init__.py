@@ -1,11 +1,14 @@
 
 import azure.functions as func
 import json
-from libs.yahoo_client import YahooClient
-from libs import cosmos
+from libs.yahoo_client import YahooClient, configure_rate_limit
+from libs import cosmos, roster_store
+from libs.cosmos_metrics import track_cosmos
 
+@track_cosmos
 def main(req: func.HttpRequest) -> func.HttpResponse:
     league_id = req.route_params.get("leagueId")
+    configure_rate_limit()
     yc = YahooClient(league_id)
     
     # Get league info and settings
@@ -22,29 +25,28 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "settings": league_settings
     }, partition=league_id)
     
-    # Get and store teams
+    # Get teams and rosters, then store them in bulk
     teams = yc.teams()
+    team_docs = []
     for t in teams:
-        cosmos.upsert("teams", {
+        team_docs.append(({
             "id": f"team-{t.get('team_id','')}",
             "leagueId": league_id,
             "teamId": t.get("team_id",""),
             "name": t.get("name",""),
             "manager": t.get("manager", "")
-        }, partition=league_id)
-        
-        # Get and store roster
-        roster = yc.roster(t.get("team_id",""), week)
-        cosmos.upsert("rosters", {
-            "id": f"roster-{t.get('team_id','')}-{week}",
-            "leagueId": league_id,
-            "teamId": t.get("team_id",""),
-            "week": week,
-            "players": roster
-        }, partition=t.get("team_id",""))
+        }, league_id))
+    
+    # All rosters in one or two collection requests instead of one per team
+    rosters = yc.rosters([t.get("team_id","") for t in teams], week)
+    
+    writes = [cosmos.bulk_upsert("teams", team_docs), roster_store.save_league_rosters(league_id, week, rosters)]
+    failed = [r["id"] for w in writes for r in w["results"] if not r["ok"]]
     
     return func.HttpResponse(json.dumps({
         "week": week, 
         "teams": len(teams),
-        "scoringType": league_settings.get("type", "unknown")
+        "scoringType": league_settings.get("type", "unknown"),
+        "requestCharge": sum(w["requestCharge"] for w in writes),
+        "failedWrites": failed
     }), status_code=200, mimetype="application/json")
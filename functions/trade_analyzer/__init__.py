@@ -0,0 +1,79 @@
+import azure.functions as func
+import json, datetime as dt
+from libs.nhl_client import schedule_matrix
+from libs import cosmos, roster_store
+from libs.cosmos_metrics import track_cosmos
+from engine.trade import analyze_trade
+
+MAX_WEEKS = 8
+
+@track_cosmos
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    league_id = req.route_params.get("leagueId")
+    
+    try:
+        data = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+    
+    if not isinstance(data, dict):
+        return func.HttpResponse("Request body must be a JSON object", status_code=400)
+    
+    try:
+        team_a = str(data.get("teamA", ""))
+        team_b = str(data.get("teamB", ""))
+        give = [str(p) for p in data.get("give", [])]
+        get = [str(p) for p in data.get("get", [])]
+        weeks = min(max(int(data.get("weeks", 1)), 1), MAX_WEEKS)
+    except (TypeError, ValueError):
+        return func.HttpResponse("give/get must be lists and weeks a number", status_code=400)
+    
+    week = data.get("week")
+    if week is not None:
+        if isinstance(week, bool) or not isinstance(week, (int, str)) or not str(week).strip().isdigit():
+            return func.HttpResponse("week must be an integer", status_code=400)
+        week = int(week)
+    
+    if not team_a or not team_b or not (give or get):
+        return func.HttpResponse("Missing teamA, teamB or players to swap (give/get)", status_code=400)
+    
+    try:
+        # Stored rosters and league settings only - no Yahoo calls on this path
+        league_doc = cosmos.get_by_id("leagues", f"league-{league_id}", partition=league_id)
+        league_settings = league_doc.get("settings", {}) if league_doc else {}
+        if week is None:
+            # Default to the week the league was last synced for, not week 1
+            week = league_doc.get("currentWeek", 1) if league_doc else 1
+        
+        roster_a = roster_store.get_roster(league_id, team_a, week)
+        roster_b = roster_store.get_roster(league_id, team_b, week)
+        if not roster_a or not roster_b:
+            return func.HttpResponse("Roster not found. Please sync the league first.", status_code=404)
+        
+        missing = [p for p in give if p not in {str(x.get("player_id")) for x in roster_a["players"]}] + \
+                  [p for p in get if p not in {str(x.get("player_id")) for x in roster_b["players"]}]
+        if missing:
+            return func.HttpResponse(f"Players not on the given rosters: {', '.join(missing)}", status_code=400)
+        
+        # Window of the in-memory season matrix, caching any roster team not indexed yet
+        today = dt.date.today()
+        start, end = today, today + dt.timedelta(days=7 * weeks - 1)
+        schedule = schedule_matrix(start, end, [player.get("nhl_team", "UNK")
+                                                for player in roster_a["players"] + roster_b["players"]])
+        
+        result = analyze_trade(roster_a["players"], roster_b["players"], give, get, schedule,
+                               league_settings.get("rosterPositions"))
+        
+        return func.HttpResponse(json.dumps({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "week": week,
+            "weeks": weeks,
+            "give": give,
+            "get": get,
+            "teamA": {"teamId": team_a, **result["teamA"]},
+            "teamB": {"teamId": team_b, **result["teamB"]}
+        }), status_code=200, mimetype="application/json")
+        
+    except Exception as e:
+        return func.HttpResponse(f"Error: {str(e)}", status_code=500)
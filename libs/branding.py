@@ -0,0 +1,58 @@
+"""Branding assets shared by emails and reports.
+
+The newest uploaded logo is tracked by a single pointer document in the logos
+container, so resolving it is one point read instead of a cross-partition
+ORDER BY, and the result is cached per process for LOGO_CACHE_SECONDS.
+"""
+from typing import Any, Dict, Optional, Tuple
+import os, threading, time
+from libs import cosmos
+
+LOGO_CONTAINER = "logos"
+LOGO_PARTITION = "default"
+CURRENT_LOGO_ID = "current-logo"
+LOGO_CACHE_SECONDS = int(os.getenv("LOGO_CACHE_SECONDS", "300"))
+
+_cached: Optional[Tuple[float, str]] = None
+_lock = threading.Lock()
+
+def _legacy_latest() -> Optional[Dict[str, Any]]:
+    # Logos uploaded before the pointer existed
+    logos = cosmos.query(LOGO_CONTAINER, "SELECT * FROM c ORDER BY c.uploadedAt DESC")
+    return logos[0] if logos else None
+
+def _point_to(logo_doc: Dict[str, Any]) -> None:
+    global _cached
+    cosmos.upsert(LOGO_CONTAINER, {
+        "id": CURRENT_LOGO_ID,
+        "logoId": logo_doc["id"],
+        "blobUrl": logo_doc.get("blobUrl", ""),
+        "uploadedAt": logo_doc.get("uploadedAt"),
+    }, partition=LOGO_PARTITION)
+    with _lock:
+        _cached = (time.monotonic() + LOGO_CACHE_SECONDS, logo_doc.get("blobUrl", ""))
+
+def set_current_logo(logo_doc: Dict[str, Any]) -> None:
+    """Store logo metadata and point the current logo at it"""
+    cosmos.upsert(LOGO_CONTAINER, logo_doc, partition=LOGO_PARTITION)
+    _point_to(logo_doc)
+
+def current_logo_url() -> str:
+    """URL of the most recently uploaded logo, or "" if there is none"""
+    global _cached
+    with _lock:
+        if _cached and _cached[0] > time.monotonic():
+            return _cached[1]
+    try:
+        pointer = cosmos.get_by_id(LOGO_CONTAINER, CURRENT_LOGO_ID, partition=LOGO_PARTITION)
+        if pointer is None:
+            latest = _legacy_latest()
+            if latest:
+                _point_to(latest)
+                return latest.get("blobUrl", "")
+        url = (pointer or {}).get("blobUrl", "")
+    except Exception:
+        return ""
+    with _lock:
+        _cached = (time.monotonic() + LOGO_CACHE_SECONDS, url)
+    return url
@@ -0,0 +1,104 @@
+"""Declarative schema for the app's Cosmos containers.
+
+Each ContainerSpec states the partition key, which paths stay out of the index
+(large bodies that are never filtered on), composite indexes for the ORDER BY
+queries and the default TTL. `python -m libs.containers` (or `python -m libs.cosmos`)
+creates missing containers and brings existing ones in line; re-running is a no-op.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+import os
+from libs import cosmos
+
+DAY = 24 * 3600
+GUIDANCE_RUNS_TTL_DAYS = int(os.getenv("GUIDANCE_RUNS_TTL_DAYS", "180"))
+
+@dataclass(frozen=True)
+class ContainerSpec:
+    name: str
+    partition_key: str = "/partitionKey"
+    excluded_paths: Tuple[str, ...] = ()
+    # Each composite index is a tuple of (path, "ascending" | "descending")
+    composite_indexes: Tuple[Tuple[Tuple[str, str], ...], ...] = ()
+    # None: TTL off; -1: on, items expire only with their own `ttl`; N: seconds after last write
+    default_ttl: Optional[int] = None
+
+    def indexing_policy(self) -> Dict[str, Any]:
+        unindexed = "/*" in self.excluded_paths
+        return {
+            "indexingMode": "consistent",
+            "automatic": True,
+            "includedPaths": [] if unindexed else [{"path": "/*"}],
+            "excludedPaths": [{"path": path} for path in self.excluded_paths] + [{"path": '/"_etag"/?'}],
+            "compositeIndexes": [[{"path": path, "order": order} for path, order in index]
+                                 for index in self.composite_indexes],
+        }
+
+SPECS: Dict[str, ContainerSpec] = {spec.name: spec for spec in [
+    ContainerSpec("leagues", excluded_paths=("/settings/*",)),
+    ContainerSpec("teams"),
+    ContainerSpec("rosters", excluded_paths=("/players/*",)),
+    # Columnar schedule arrays are only ever read whole; lookups use season/teamCode
+    ContainerSpec("schedules", excluded_paths=("/teams/*", "/gameIds/*", "/days/*", "/home/*", "/away/*")),
+    ContainerSpec("managers"),
+    # Point reads only
+    ContainerSpec("oauthTokens", excluded_paths=("/*",)),
+    # Runs expire after GUIDANCE_RUNS_TTL_DAYS
+    ContainerSpec("guidanceRuns", excluded_paths=("/payload/*",),
+                  default_ttl=GUIDANCE_RUNS_TTL_DAYS * DAY),
+    # Guidance cache entries: point reads only, each carries its own 14-day ttl
+    ContainerSpec("guidanceCache", excluded_paths=("/*",), default_ttl=-1),
+    ContainerSpec("reports", excluded_paths=("/htmlContent/*", "/pdfContent/*"),
+                  composite_indexes=((("/leagueId", "ascending"), ("/createdAt", "descending")),)),
+    ContainerSpec("logos"),
+    # Small coordination documents (shared rate-limit buckets); point reads only
+    ContainerSpec("leases", excluded_paths=("/*",)),
+]}
+
+def _differs(spec: ContainerSpec, properties: Dict[str, Any]) -> bool:
+    current = properties.get("indexingPolicy", {})
+    wanted = spec.indexing_policy()
+    paths = lambda policy, key: sorted(p["path"] for p in policy.get(key, []))
+    return (properties.get("defaultTtl") != spec.default_ttl
+            or paths(current, "includedPaths") != paths(wanted, "includedPaths")
+            or paths(current, "excludedPaths") != paths(wanted, "excludedPaths")
+            or current.get("compositeIndexes", []) != wanted["compositeIndexes"])
+
+def provision(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Create or update containers to match SPECS; returns {name: created|updated|unchanged}"""
+    specs = [SPECS[name] for name in (names or SPECS)]
+    db = cosmos._database()
+    if cosmos.BACKEND != "cosmos":
+        # The embedded store has no indexes or TTL; containers exist implicitly
+        return {spec.name: "unchanged" for spec in specs}
+
+    from azure.cosmos import PartitionKey
+    from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+    outcome = {}
+    for spec in specs:
+        partition_key = PartitionKey(path=spec.partition_key)
+        try:
+            properties = db.get_container_client(spec.name).read()
+        except CosmosResourceNotFoundError:
+            db.create_container(id=spec.name, partition_key=partition_key,
+                                indexing_policy=spec.indexing_policy(), default_ttl=spec.default_ttl)
+            outcome[spec.name] = "created"
+            continue
+
+        current_paths = properties.get("partitionKey", {}).get("paths", [])
+        if current_paths != [spec.partition_key]:
+            raise ValueError(f"Container {spec.name} is partitioned on {current_paths}, expected "
+                             f"{spec.partition_key}; partition keys cannot be changed in place")
+        if _differs(spec, properties):
+            db.replace_container(spec.name, partition_key=partition_key,
+                                 indexing_policy=spec.indexing_policy(), default_ttl=spec.default_ttl)
+            outcome[spec.name] = "updated"
+        else:
+            outcome[spec.name] = "unchanged"
+    return outcome
+
+if __name__ == "__main__":
+    # python -m libs.containers  (with COSMOS_ENDPOINT/COSMOS_KEY set)
+    for name, result in provision().items():
+        print(f"{name}: {result}")
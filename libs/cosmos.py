@@ -1,45 +1,367 @@
-
-from typing import Any, Dict, Optional, List
-import os
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.identity import DefaultAzureCredential
+from typing import Any, Dict, Optional, List, Iterable, Iterator, Sequence, Tuple
+import contextlib, contextvars, copy, os, re, threading, time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from libs import cosmos_metrics
+from libs.cosmos_codec import decode_lazily, encode_fields
 
 DB_NAME = os.getenv("COSMOS_DB", "fantasy_helper")
 COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT")
 COSMOS_KEY = os.getenv("COSMOS_KEY")
+# "cosmos" (default), or "memory"/"sqlite" for the embedded store in libs/cosmos_local
+BACKEND = os.getenv("COSMOS_BACKEND", "cosmos").lower()
+SQLITE_PATH = os.getenv("COSMOS_SQLITE_PATH", "cosmos_local.db")
+# Cosmos DB allows at most 100 operations per transactional batch
+BATCH_LIMIT = 100
+BULK_WORKERS = int(os.getenv("COSMOS_BULK_WORKERS", "8"))
+
+# Read cache defaults: seconds a get_by_id result may be served from memory per container
+# (0 = never cached); containers not listed use DEFAULT_READ_CACHE_TTL. OAuth tokens are
+# cached by libs/oauth_tokens, which knows when they expire
+READ_CACHE_TTLS = {"oauthTokens": 0, "leagues": 300, "teams": 300, "managers": 300,
+                   "schedules": 3600, "logos": 300, "reports": 0, "guidanceRuns": 0, "leases": 0}
+DEFAULT_READ_CACHE_TTL = 60
+READ_CACHE_MAX_ENTRIES = int(os.getenv("COSMOS_READ_CACHE_SIZE", "1024"))
 
-# Use Managed Identity in production, key in local dev
-if COSMOS_ENDPOINT and COSMOS_KEY:
-    _client = CosmosClient(COSMOS_ENDPOINT, credential=COSMOS_KEY)
-elif COSMOS_ENDPOINT:
-    # Production: use Managed Identity
-    credential = DefaultAzureCredential()
-    _client = CosmosClient(COSMOS_ENDPOINT, credential=credential)
-else:
-    _client = None
+_db = None
+_containers: Dict[str, Any] = {}
+_client_lock = threading.Lock()
 
-_db = _client.get_database_client(DB_NAME) if _client else None
+def _database():
+    """Database client, created on first use so importing this module stays cheap"""
+    global _db
+    if _db is None:
+        with _client_lock:
+            if _db is None and BACKEND in ("memory", "sqlite"):
+                from libs.cosmos_local import LocalDatabase
+                _db = LocalDatabase(":memory:" if BACKEND == "memory" else SQLITE_PATH)
+            if _db is None:
+                assert COSMOS_ENDPOINT, "Cosmos not configured (set COSMOS_ENDPOINT or COSMOS_BACKEND=memory)"
+                from azure.cosmos import CosmosClient
+                
+                # Use Managed Identity in production, key in local dev
+                if COSMOS_KEY:
+                    client = CosmosClient(COSMOS_ENDPOINT, credential=COSMOS_KEY)
+                else:
+                    from azure.identity import DefaultAzureCredential
+                    client = CosmosClient(COSMOS_ENDPOINT, credential=DefaultAzureCredential())
+                _db = client.get_database_client(DB_NAME)
+    return _db
 
 def _container(name: str):
-    assert _db is not None, "Cosmos not configured"
+    """Memoized container handle (no network call)"""
+    c = _containers.get(name)
+    if c is None:
+        c = _containers.setdefault(name, _database().get_container_client(name))
+    return c
+
+def provision(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Create/update containers from the registry in libs/containers (never done on the data path)"""
+    from libs import containers
+    return containers.provision(names)
+
+class _ReadCache:
+    """Size-bounded LRU of get_by_id results with per-container TTLs and hit/miss counters"""
+
+    def __init__(self, max_entries: int, ttls: Dict[str, float]):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.hits = self.misses = 0
+        self.request_charge_saved = 0.0
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl(self, container: str) -> float:
+        return self.ttls.get(container, DEFAULT_READ_CACHE_TTL)
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.request_charge_saved += entry[2]
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Tuple[str, str, str], doc: Dict[str, Any], request_charge: float) -> None:
+        ttl = self.ttl(key[0])
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(doc), request_charge)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Tuple[str, str, str]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hitRate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries), "requestChargeSaved": round(self.request_charge_saved, 2)}
+
+# Process-wide cache (COSMOS_READ_CACHE=1), and the cache of the current read_cache() block
+_read_cache: Optional[_ReadCache] = None
+_scoped_cache: contextvars.ContextVar[Optional[_ReadCache]] = contextvars.ContextVar("cosmos_read_cache",
+                                                                                     default=None)
+
+def _cache() -> Optional[_ReadCache]:
+    return _scoped_cache.get() or _read_cache
+
+def enable_read_cache(max_entries: int = READ_CACHE_MAX_ENTRIES, ttls: Optional[Dict[str, float]] = None) -> None:
+    """Opt in to a get_by_id cache for the whole process (also enabled by COSMOS_READ_CACHE=1).
+    
+    Entries expire per container TTL, the least recently used are evicted past
+    max_entries, and upserts from this process invalidate the document they write.
+    Writes by other instances are only seen once the TTL runs out; prefer
+    read_cache() to limit that to one invocation.
+    """
+    global _read_cache
+    if _read_cache is None:
+        _read_cache = _ReadCache(max_entries, {**READ_CACHE_TTLS, **(ttls or {})})
+
+@contextlib.contextmanager
+def read_cache(max_entries: int = READ_CACHE_MAX_ENTRIES, ttls: Optional[Dict[str, float]] = None):
+    """get_by_id cache for the duration of a with block, e.g. one function invocation.
+    
+    It is visible to this context only (and to worker threads started through
+    cosmos_metrics.submit), so other invocations in the same worker keep reading Cosmos.
+    """
+    cache = _ReadCache(max_entries, {**READ_CACHE_TTLS, **(ttls or {})})
+    token = _scoped_cache.set(cache)
     try:
-        return _db.get_container_client(name)
-    except Exception:
-        _db.create_container_if_not_exists(id=name, partition_key=PartitionKey(path="/partitionKey"))
-        return _db.get_container_client(name)
+        yield cache
+    finally:
+        _scoped_cache.reset(token)
+
+def read_cache_stats() -> Optional[Dict[str, Any]]:
+    """Hit/miss counters and the RU charge served from memory, or None when disabled"""
+    cache = _cache()
+    return cache.stats() if cache else None
+
+def _invalidate(container: str, doc: Dict[str, Any], partition: str) -> None:
+    if doc.get("id") is None:
+        return
+    for cache in (_scoped_cache.get(), _read_cache):
+        if cache is not None:
+            cache.invalidate((container, str(partition), doc["id"]))
+
+if os.getenv("COSMOS_READ_CACHE", "").lower() in ("1", "true", "yes"):
+    enable_read_cache()
+
+def _request_charge(headers: Optional[Dict[str, Any]]) -> float:
+    try:
+        return float((headers or {}).get("x-ms-request-charge", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+def _last_request_charge(c) -> float:
+    # Query pages don't go through response_hook; the client keeps the last response's headers
+    return _request_charge(getattr(getattr(c, "client_connection", None), "last_response_headers", None))
+
+def _record(container: str, operation: str, charges: List[float], started: float, statement: str = "") -> None:
+    cosmos_metrics.record(container, operation, sum(charges), (time.perf_counter() - started) * 1000, statement)
 
 def upsert(container: str, doc: Dict[str, Any], partition: str):
     c = _container(container)
-    doc["partitionKey"] = partition
-    return c.upsert_item(doc)
+    _invalidate(container, doc, partition)
+    charges: List[float] = []
+    started = time.perf_counter()
+    try:
+        return decode_lazily(container, c.upsert_item(
+            {**encode_fields(container, doc), "partitionKey": partition},
+            response_hook=lambda headers, _: charges.append(_request_charge(headers))))
+    finally:
+        _record(container, "upsert", charges, started)
+
+def patch(container: str, id: str, partition: str, fields: Dict[str, Any]):
+    """Set top-level fields of an existing document without rewriting the rest of it"""
+    c = _container(container)
+    _invalidate(container, {"id": id}, partition)
+    operations = [{"op": "set", "path": f"/{name}", "value": value}
+                  for name, value in encode_fields(container, fields).items()]
+    charges: List[float] = []
+    started = time.perf_counter()
+    try:
+        return decode_lazily(container, c.patch_item(
+            item=id, partition_key=partition, patch_operations=operations,
+            response_hook=lambda headers, _: charges.append(_request_charge(headers))))
+    finally:
+        _record(container, "patch", charges, started)
+
+def bulk_upsert(container: str, items: Iterable[Tuple[Dict[str, Any], str]],
+                max_workers: int = BULK_WORKERS) -> Dict[str, Any]:
+    """Upsert many (doc, partition) pairs in as few round trips as possible.
+    
+    Documents are grouped by partition key and sent as transactional batches of
+    up to BATCH_LIMIT (each batch commits atomically); partitions are written in
+    parallel. Callers' dicts are not modified.
+    Returns {"results": [{"id", "partition", "ok", "statusCode" | "error"}, ...] in
+    input order, "requestCharge": total RU}.
+    """
+    c = _container(container)
+    items = list(items)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    for doc, partition in items:
+        _invalidate(container, doc, partition)
+    
+    by_partition = defaultdict(list)
+    for i, (_, partition) in enumerate(items):
+        by_partition[partition].append(i)
+    chunks = [(partition, indexes[k:k + BATCH_LIMIT])
+              for partition, indexes in by_partition.items()
+              for k in range(0, len(indexes), BATCH_LIMIT)]
+    
+    def _write(chunk) -> Tuple[str, List[float], float]:
+        partition, indexes = chunk
+        docs = [{**encode_fields(container, items[i][0]), "partitionKey": partition} for i in indexes]
+        charges: List[float] = []
+        started = time.perf_counter()
+        try:
+            if len(docs) == 1:
+                c.upsert_item(docs[0], response_hook=lambda headers, _: charges.append(_request_charge(headers)))
+                statuses = [200]
+            else:
+                responses = c.execute_item_batch([("upsert", (doc,)) for doc in docs], partition_key=partition)
+                charges.extend(float(r.get("requestCharge", 0)) for r in responses)
+                statuses = [r.get("statusCode") for r in responses]
+            for i, status in zip(indexes, statuses):
+                results[i] = {"id": items[i][0].get("id"), "partition": partition, "ok": True, "statusCode": status}
+        except Exception as e:
+            for i in indexes:
+                results[i] = {"id": items[i][0].get("id"), "partition": partition, "ok": False, "error": str(e)}
+        return ("upsert" if len(docs) == 1 else "batch"), charges, started
+    
+    if not chunks:
+        return {"results": [], "requestCharge": 0.0}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        written = list(pool.map(_write, chunks))
+    # Worker threads don't share the invocation's context; record from the caller
+    for operation, charges, started in written:
+        _record(container, operation, charges, started)
+    return {"results": results, "requestCharge": sum(sum(charges) for _, charges, _ in written)}
 
 def get_by_id(container: str, id: str, partition: str) -> Optional[Dict[str, Any]]:
+    cache = _cache()
+    key = (container, str(partition), id)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return decode_lazily(container, cached)
+    
     c = _container(container)
+    charges: List[float] = []
+    started = time.perf_counter()
     try:
-        return c.read_item(item=id, partition_key=partition)
+        doc = c.read_item(item=id, partition_key=partition,
+                          response_hook=lambda headers, _: charges.append(_request_charge(headers)))
     except Exception:
         return None
+    finally:
+        _record(container, "read", charges, started)
+    if cache is not None:
+        cache.put(key, doc, sum(charges))
+    return decode_lazily(container, doc)
+
+class ConcurrencyConflict(Exception):
+    """An optimistic write lost: the document changed since it was read, or already exists"""
+
+def _if_not_modified():
+    if BACKEND == "cosmos":
+        from azure.core import MatchConditions
+        return MatchConditions.IfNotModified
+    return "IfNotModified"
 
-def query(container: str, query: str, params: Optional[List[Dict[str, Any]]] = None):
+def replace_if_match(container: str, doc: Dict[str, Any], partition: str,
+                     etag: Optional[str]) -> Dict[str, Any]:
+    """Write doc only if it is unchanged since it was read with `etag`.
+    
+    With etag None the document must not exist yet. Raises ConcurrencyConflict
+    when another writer got there first; re-read and retry.
+    """
     c = _container(container)
-    return list(c.query_items(query=query, parameters=params or [], enable_cross_partition_query=True))
+    _invalidate(container, doc, partition)
+    body = {**encode_fields(container, doc), "partitionKey": partition}
+    charges: List[float] = []
+    hook = lambda headers, _: charges.append(_request_charge(headers))
+    started = time.perf_counter()
+    try:
+        if etag is None:
+            result = c.create_item(body, response_hook=hook)
+        else:
+            result = c.replace_item(item=doc["id"], body=body, etag=etag,
+                                    match_condition=_if_not_modified(), response_hook=hook)
+    except Exception as e:
+        if getattr(e, "status_code", None) in (409, 412):
+            raise ConcurrencyConflict(str(e)) from e
+        raise
+    finally:
+        _record(container, "replace", charges, started)
+    return decode_lazily(container, result)
+
+def delete(container: str, id: str, partition: str) -> None:
+    c = _container(container)
+    _invalidate(container, {"id": id}, partition)
+    charges: List[float] = []
+    started = time.perf_counter()
+    try:
+        c.delete_item(item=id, partition_key=partition,
+                      response_hook=lambda headers, _: charges.append(_request_charge(headers)))
+    finally:
+        _record(container, "delete", charges, started)
+
+def project(query: str, fields: Sequence[str]) -> str:
+    """Rewrite `SELECT * FROM c ...` to select only the given (dotted) fields"""
+    match = re.match(r"\s*SELECT\s+\*\s+FROM\s+(\w+)", query, re.IGNORECASE)
+    if not match:
+        raise ValueError("Field projection needs a query starting with SELECT * FROM <alias>")
+    alias = match.group(1)
+    columns = ", ".join(f"{alias}.{field}" for field in fields)
+    return f"SELECT {columns} FROM {alias}{query[match.end():]}"
+
+def query_pages(container: str, query: str, params: Optional[List[Dict[str, Any]]] = None,
+                fields: Optional[Sequence[str]] = None, partition: Optional[str] = None,
+                page_size: int = 100, continuation: Optional[str] = None
+                ) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (documents, continuation token) one page at a time.
+    
+    Only one page is held in memory. Pass `fields` to fetch just those properties,
+    `partition` to keep the query in a single partition, and a token from a previous
+    page as `continuation` to resume there (None means there are no more pages).
+    """
+    c = _container(container)
+    if fields:
+        query = project(query, fields)
+    scope = {"partition_key": partition} if partition is not None else {"enable_cross_partition_query": True}
+    pager = c.query_items(query=query, parameters=params or [], max_item_count=page_size, **scope
+                          ).by_page(continuation)
+    pages = iter(pager)
+    while True:
+        started = time.perf_counter()
+        page = next(pages, None)
+        if page is None:
+            return
+        docs = [decode_lazily(container, doc) for doc in page]
+        _record(container, "query", [_last_request_charge(c)], started, query)
+        yield docs, pager.continuation_token
+
+def query_iter(container: str, query: str, params: Optional[List[Dict[str, Any]]] = None,
+               fields: Optional[Sequence[str]] = None, partition: Optional[str] = None,
+               page_size: int = 100) -> Iterator[Dict[str, Any]]:
+    """Stream matching documents, fetching pages lazily"""
+    for page, _ in query_pages(container, query, params, fields=fields, partition=partition, page_size=page_size):
+        yield from page
+
+def query(container: str, query: str, params: Optional[List[Dict[str, Any]]] = None,
+          fields: Optional[Sequence[str]] = None, partition: Optional[str] = None) -> List[Dict[str, Any]]:
+    return list(query_iter(container, query, params, fields=fields, partition=partition))
+
+if __name__ == "__main__":
+    # python -m libs.cosmos  (with COSMOS_ENDPOINT/COSMOS_KEY set)
+    for name, result in provision().items():
+        print(f"{DB_NAME}.{name}: {result}")
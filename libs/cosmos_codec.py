@@ -0,0 +1,99 @@
+"""Transparent gzip compression of designated large document fields.
+
+On write, a listed field whose JSON form is at least COMPRESS_MIN_BYTES is stored
+as {"_codec": "gzip-json", "data": <base64>}. Documents read back are LazyDoc
+instances that decode such a field the first time it is accessed, so listing or
+touching metadata never pays for inflating report bodies.
+"""
+from typing import Any, Dict, Iterator, List, Tuple
+import base64, gzip, json, os
+
+CODEC = "gzip-json"
+COMPRESS_MIN_BYTES = int(os.getenv("COSMOS_COMPRESS_MIN_BYTES", "1024"))
+# Fields compressed per container; anything queried or filtered on must stay out of here
+COMPRESSED_FIELDS = {
+    "reports": ("htmlContent", "pdfContent"),
+    "guidanceRuns": ("payload",),
+    "guidanceCache": ("entry",),
+}
+
+def is_encoded(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("_codec") == CODEC
+
+def _compress(raw: bytes) -> Dict[str, Any]:
+    return {"_codec": CODEC, "size": len(raw), "data": base64.b64encode(gzip.compress(raw, 6)).decode()}
+
+def encode(value: Any) -> Dict[str, Any]:
+    return _compress(json.dumps(value, separators=(",", ":")).encode())
+
+def decode(value: Dict[str, Any]) -> Any:
+    return json.loads(gzip.decompress(base64.b64decode(value["data"])))
+
+def encode_fields(container: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of doc with its container's large fields compressed (doc itself is not modified)"""
+    fields = COMPRESSED_FIELDS.get(container, ())
+    if not any(field in doc for field in fields):
+        return doc
+    out = doc.to_dict() if isinstance(doc, LazyDoc) else dict(doc)
+    for field in fields:
+        value = out.get(field)
+        if value is None or is_encoded(value):
+            continue
+        raw = json.dumps(value, separators=(",", ":")).encode()
+        if len(raw) >= COMPRESS_MIN_BYTES:
+            out[field] = _compress(raw)
+    return out
+
+class LazyDoc(dict):
+    """Document whose compressed fields are decoded (once) on first access.
+
+    Item access, get(), pop()/popitem()/setdefault(), items()/values() and
+    iteration-based copies ({**doc}, dict(doc)) see decoded values. json.dumps
+    reads the raw dict storage, so serialize doc.to_dict() instead.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if is_encoded(value):
+            value = decode(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self) -> Iterator[str]:
+        # Overriding __iter__ makes dict(doc) and {**doc} go through keys()/__getitem__
+        return dict.__iter__(self)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in dict.keys(self)]
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in dict.keys(self)]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self[key]
+        dict.__delitem__(self, key)
+        return value
+
+    def popitem(self) -> Tuple[str, Any]:
+        key, value = dict.popitem(self)
+        return key, decode(value) if is_encoded(value) else value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def copy(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with every compressed field decoded, for export or json.dumps"""
+        return dict(self.items())
+
+def decode_lazily(container: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return LazyDoc(doc) if container in COMPRESSED_FIELDS and isinstance(doc, dict) else doc
@@ -0,0 +1,309 @@
+"""Embedded stand-in for the Cosmos containers, for offline runs and benchmarks.
+
+Selected with COSMOS_BACKEND=memory (SQLite in memory) or COSMOS_BACKEND=sqlite
+(file at COSMOS_SQLITE_PATH). It implements the slice of the azure-cosmos
+ContainerProxy API that libs/cosmos uses, with the same partition semantics:
+documents are keyed by (partition, id), the partition value comes from
+/partitionKey, and single-partition queries only see their own partition.
+
+Queries support the SQL subset the app uses:
+    SELECT * | SELECT c.a, c.b.c FROM c
+    [WHERE c.x <op> @param|literal [AND ...]]   (op: = != <> < <= > >=)
+    [ORDER BY c.x [ASC|DESC][, ...]]
+Anything else raises ValueError rather than returning wrong results.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import json, re, sqlite3, threading, time, uuid
+
+PARTITION_FIELD = "partitionKey"
+_HEADERS = {"x-ms-request-charge": "0"}
+
+class LocalNotFound(Exception):
+    status_code = 404
+
+class LocalConflict(Exception):
+    status_code = 409
+
+class LocalPreconditionFailed(Exception):
+    status_code = 412
+
+# --- query parsing ---
+
+_QUERY = re.compile(
+    r"^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<alias>\w+)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?\s*$",
+    re.IGNORECASE | re.DOTALL)
+_CONDITION = re.compile(r"^\s*(?P<field>\w+(?:\.\w+)*)\s*(?P<op>=|!=|<>|<=|>=|<|>)\s*(?P<value>.+?)\s*$")
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda a, b: a == b, "!=": lambda a, b: a != b, "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+}
+_MISSING = object()
+
+def _path(field: str, alias: str) -> List[str]:
+    parts = field.split(".")
+    if parts[0] != alias or len(parts) < 2:
+        raise ValueError(f"Unsupported field reference: {field}")
+    return parts[1:]
+
+def _get(doc: Dict[str, Any], path: List[str]) -> Any:
+    value: Any = doc
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+def _literal(token: str, params: Dict[str, Any]) -> Any:
+    if token.startswith("@"):
+        if token not in params:
+            raise ValueError(f"Missing query parameter {token}")
+        return params[token]
+    if token[0] in "'\"" and token[-1] == token[0]:
+        return token[1:-1]
+    lowered = token.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    try:
+        return json.loads(token)
+    except ValueError:
+        raise ValueError(f"Unsupported query value: {token}")
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Cosmos orders undefined < null < booleans < numbers < strings
+    if value is _MISSING:
+        return (0, 0)
+    if value is None:
+        return (1, 0)
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    return (4, str(value))
+
+def compile_query(query: str, parameters: Optional[List[Dict[str, Any]]] = None
+                  ) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Turn a query in the supported subset into a function over a list of documents"""
+    match = _QUERY.match(query)
+    if not match:
+        raise ValueError(f"Unsupported query: {query}")
+    alias = match.group("alias")
+    params = {p["name"]: p["value"] for p in parameters or []}
+
+    select = match.group("select").strip()
+    projection = None
+    if select != "*":
+        projection = [(_path(field.strip(), alias)) for field in select.split(",")]
+
+    conditions = []
+    if match.group("where"):
+        for clause in re.split(r"\s+AND\s+", match.group("where"), flags=re.IGNORECASE):
+            cond = _CONDITION.match(clause)
+            if not cond:
+                raise ValueError(f"Unsupported WHERE clause: {clause}")
+            conditions.append((_path(cond.group("field"), alias), _OPERATORS[cond.group("op")],
+                               _literal(cond.group("value"), params)))
+
+    ordering = []
+    if match.group("order"):
+        for term in match.group("order").split(","):
+            parts = term.split()
+            if len(parts) not in (1, 2) or (len(parts) == 2 and parts[1].upper() not in ("ASC", "DESC")):
+                raise ValueError(f"Unsupported ORDER BY term: {term}")
+            ordering.append((_path(parts[0], alias), len(parts) == 2 and parts[1].upper() == "DESC"))
+
+    def _matches(doc: Dict[str, Any]) -> bool:
+        for path, op, value in conditions:
+            field = _get(doc, path)
+            try:
+                if field is _MISSING or not op(field, value):
+                    return False
+            except TypeError:  # comparisons across types are undefined in Cosmos
+                return False
+        return True
+
+    def _project(doc: Dict[str, Any]) -> Dict[str, Any]:
+        if projection is None:
+            return doc
+        out = {}
+        for path in projection:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                out[path[-1]] = value
+        return out
+
+    def run(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        rows = [doc for doc in docs if _matches(doc)]
+        for path, descending in reversed(ordering):
+            rows.sort(key=lambda doc: _sort_key(_get(doc, path)), reverse=descending)
+        return [_project(doc) for doc in rows]
+
+    return run
+
+# --- container / database ---
+
+class _ClientConnection:
+    last_response_headers = _HEADERS
+
+class _Pager:
+    """Mimics azure.core paging: iterate pages, read continuation_token after each"""
+
+    def __init__(self, rows: List[Dict[str, Any]], page_size: int, continuation: Optional[str]):
+        self.rows = rows
+        self.page_size = max(page_size, 1)
+        self.offset = int(continuation) if continuation else 0
+        self.continuation_token = continuation
+
+    def __iter__(self) -> Iterator[Iterator[Dict[str, Any]]]:
+        while self.offset < len(self.rows):
+            page = self.rows[self.offset:self.offset + self.page_size]
+            self.offset += len(page)
+            self.continuation_token = str(self.offset) if self.offset < len(self.rows) else None
+            yield iter(page)
+
+class _ItemPaged:
+    def __init__(self, rows: List[Dict[str, Any]], page_size: int):
+        self.rows = rows
+        self.page_size = page_size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.rows)
+
+    def by_page(self, continuation_token: Optional[str] = None) -> _Pager:
+        return _Pager(self.rows, self.page_size, continuation_token)
+
+class LocalContainer:
+    """The ContainerProxy subset used by libs/cosmos, stored in a shared SQLite connection"""
+
+    client_connection = _ClientConnection()
+
+    def __init__(self, db: "LocalDatabase", name: str):
+        self.db = db
+        self.id = name
+
+    def _write(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {**body, "_etag": f'"{uuid.uuid4()}"', "_ts": int(time.time())}
+        self.db.conn.execute(
+            "INSERT OR REPLACE INTO docs (container, partition, id, body) VALUES (?, ?, ?, ?)",
+            (self.id, json.dumps(body.get(PARTITION_FIELD)), body["id"], json.dumps(doc)))
+        return doc
+
+    def _read(self, item: str, partition_key: Any) -> Optional[Dict[str, Any]]:
+        row = self.db.conn.execute(
+            "SELECT body FROM docs WHERE container = ? AND partition = ? AND id = ?",
+            (self.id, json.dumps(partition_key), item)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def upsert_item(self, body: Dict[str, Any], response_hook=None, **kwargs) -> Dict[str, Any]:
+        with self.db.lock, self.db.conn:
+            doc = self._write(body)
+        if response_hook:
+            response_hook(_HEADERS, doc)
+        return doc
+
+    def create_item(self, body: Dict[str, Any], response_hook=None, **kwargs) -> Dict[str, Any]:
+        with self.db.lock, self.db.conn:
+            if self._read(body["id"], body.get(PARTITION_FIELD)) is not None:
+                raise LocalConflict(f"{self.id}/{body['id']} already exists")
+            doc = self._write(body)
+        if response_hook:
+            response_hook(_HEADERS, doc)
+        return doc
+
+    def replace_item(self, item: str, body: Dict[str, Any], etag: Optional[str] = None,
+                     match_condition: Any = None, response_hook=None, **kwargs) -> Dict[str, Any]:
+        with self.db.lock, self.db.conn:
+            current = self._read(item, body.get(PARTITION_FIELD))
+            if current is None:
+                raise LocalNotFound(f"{self.id}/{item} not found")
+            if etag is not None and match_condition is not None and current.get("_etag") != etag:
+                raise LocalPreconditionFailed(f"{self.id}/{item} was modified")
+            doc = self._write(body)
+        if response_hook:
+            response_hook(_HEADERS, doc)
+        return doc
+
+    def patch_item(self, item: str, partition_key: Any, patch_operations: List[Dict[str, Any]],
+                   response_hook=None, **kwargs) -> Dict[str, Any]:
+        with self.db.lock, self.db.conn:
+            current = self._read(item, partition_key)
+            if current is None:
+                raise LocalNotFound(f"{self.id}/{item} not found in partition {partition_key!r}")
+            body = {key: value for key, value in current.items() if key not in ("_etag", "_ts")}
+            for operation in patch_operations:
+                path = operation["path"].lstrip("/")
+                if operation["op"] not in ("set", "add", "replace") or not path or "/" in path:
+                    raise ValueError(f"Unsupported patch operation: {operation}")
+                body[path] = operation["value"]
+            doc = self._write(body)
+        if response_hook:
+            response_hook(_HEADERS, doc)
+        return doc
+
+    def read_item(self, item: str, partition_key: Any, response_hook=None, **kwargs) -> Dict[str, Any]:
+        with self.db.lock:
+            doc = self._read(item, partition_key)
+        if doc is None:
+            raise LocalNotFound(f"{self.id}/{item} not found in partition {partition_key!r}")
+        if response_hook:
+            response_hook(_HEADERS, doc)
+        return doc
+
+    def delete_item(self, item: str, partition_key: Any, response_hook=None, **kwargs) -> None:
+        with self.db.lock, self.db.conn:
+            deleted = self.db.conn.execute(
+                "DELETE FROM docs WHERE container = ? AND partition = ? AND id = ?",
+                (self.id, json.dumps(partition_key), item)).rowcount
+        if not deleted:
+            raise LocalNotFound(f"{self.id}/{item} not found in partition {partition_key!r}")
+        if response_hook:
+            response_hook(_HEADERS, None)
+
+    def execute_item_batch(self, batch_operations: List[Tuple[str, Tuple]], partition_key: Any, **kwargs
+                           ) -> List[Dict[str, Any]]:
+        results = []
+        with self.db.lock, self.db.conn:  # one transaction: all or nothing, like a Cosmos batch
+            for operation, args in batch_operations:
+                if operation != "upsert":
+                    raise ValueError(f"Unsupported batch operation: {operation}")
+                body = args[0]
+                if body.get(PARTITION_FIELD) != partition_key:
+                    raise ValueError("Batch documents must share the batch partition key")
+                results.append({"statusCode": 200, "requestCharge": 0.0, "resourceBody": self._write(body)})
+        return results
+
+    def query_items(self, query: str, parameters: Optional[List[Dict[str, Any]]] = None,
+                    partition_key: Any = None, enable_cross_partition_query: Optional[bool] = None,
+                    max_item_count: Optional[int] = None, response_hook=None, **kwargs) -> _ItemPaged:
+        run = compile_query(query, parameters)
+        with self.db.lock:
+            if partition_key is not None:
+                rows = self.db.conn.execute("SELECT body FROM docs WHERE container = ? AND partition = ?",
+                                            (self.id, json.dumps(partition_key))).fetchall()
+            elif enable_cross_partition_query:
+                rows = self.db.conn.execute("SELECT body FROM docs WHERE container = ?", (self.id,)).fetchall()
+            else:
+                raise ValueError("Cross-partition query requires enable_cross_partition_query=True")
+        results = run([json.loads(row[0]) for row in rows])
+        if response_hook:
+            response_hook(_HEADERS, results)
+        return _ItemPaged(results, max_item_count or 100)
+
+class LocalDatabase:
+    """DatabaseProxy stand-in; containers exist implicitly"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS docs (container TEXT, partition TEXT, id TEXT, body TEXT,"
+                              " PRIMARY KEY (container, partition, id))")
+
+    def get_container_client(self, name: str) -> LocalContainer:
+        return LocalContainer(self, name)
+
+    def create_container_if_not_exists(self, id: str, **kwargs) -> LocalContainer:
+        return LocalContainer(self, id)
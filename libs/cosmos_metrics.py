@@ -0,0 +1,105 @@
+"""Per-invocation accounting of Cosmos request charge (RU) and latency.
+
+cosmos.* records every operation into the accumulator of the current invocation
+(worker threads see it when started through submit());
+wrap a function's main() in @track_cosmos to get one summary log line per run and,
+when OpenTelemetry is configured for the app, cosmos.* metrics in App Insights.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+import contextvars, functools, logging, os, threading
+
+TOP_OPERATIONS = int(os.getenv("COSMOS_METRICS_TOP", "5"))
+
+class Accumulator:
+    """RU/latency totals keyed by (container, operation, statement)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ops: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, container: str, operation: str, request_charge: float, duration_ms: float, statement: str = "") -> None:
+        with self._lock:
+            op = self.ops.setdefault((container, operation, statement),
+                                     {"count": 0, "requestCharge": 0.0, "durationMs": 0.0})
+            op["count"] += 1
+            op["requestCharge"] += request_charge
+            op["durationMs"] += duration_ms
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            ops = [{"container": c, "operation": o, "statement": s, "count": v["count"],
+                    "requestCharge": round(v["requestCharge"], 2), "durationMs": round(v["durationMs"], 1)}
+                   for (c, o, s), v in self.ops.items()]
+        ops.sort(key=lambda op: op["requestCharge"], reverse=True)
+        return {
+            "function": self.name,
+            "calls": sum(op["count"] for op in ops),
+            "requestCharge": round(sum(op["requestCharge"] for op in ops), 2),
+            "durationMs": round(sum(op["durationMs"] for op in ops), 1),
+            "top": ops[:TOP_OPERATIONS],
+        }
+
+_current: contextvars.ContextVar[Optional[Accumulator]] = contextvars.ContextVar("cosmos_metrics", default=None)
+
+_instruments = None
+_instruments_lock = threading.Lock()
+
+def _otel_instruments():
+    """(calls counter, RU histogram, latency histogram) or None when opentelemetry is not installed"""
+    global _instruments
+    if _instruments is None:
+        with _instruments_lock:
+            if _instruments is None:
+                try:
+                    from opentelemetry import metrics
+                except ImportError:
+                    _instruments = ()
+                else:
+                    meter = metrics.get_meter("fantasy.cosmos")
+                    _instruments = (meter.create_counter("cosmos.calls"),
+                                    meter.create_histogram("cosmos.request_charge", unit="RU"),
+                                    meter.create_histogram("cosmos.duration", unit="ms"))
+    return _instruments or None
+
+def current() -> Optional[Accumulator]:
+    return _current.get()
+
+def record(container: str, operation: str, request_charge: float, duration_ms: float, statement: str = "") -> None:
+    """Add one Cosmos call to the running invocation (no-op outside @track_cosmos)"""
+    acc = _current.get()
+    if acc is None:
+        return
+    acc.add(container, operation, request_charge, duration_ms, statement)
+    instruments = _otel_instruments()
+    if instruments:
+        calls, charge, duration = instruments
+        attributes = {"function": acc.name, "container": container, "operation": operation}
+        calls.add(1, attributes)
+        charge.record(request_charge, attributes)
+        duration.record(duration_ms, attributes)
+
+def submit(pool, fn: Callable, *args: Any):
+    """pool.submit() that keeps the caller's invocation, so the worker's Cosmos calls are counted.
+    
+    Work still running when the invocation ends is exported to OpenTelemetry but
+    misses that invocation's summary log line.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+def track_cosmos(fn: Callable) -> Callable:
+    """Collect Cosmos usage for one function invocation and log it when the invocation ends"""
+    name = fn.__module__.rsplit(".", 1)[-1]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current.set(Accumulator(name))
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            summary = _current.get().summary()
+            _current.reset(token)
+            logging.info(f"Cosmos usage for {name}: {summary['calls']} calls, "
+                         f"{summary['requestCharge']} RU, {summary['durationMs']} ms",
+                         extra={"custom_dimensions": summary})
+    return wrapper
@@ -2,22 +2,16 @@
 import base64, email.message
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from libs import cosmos
+from libs import oauth_tokens
 
 def send_gmail(to_addr: str, subject: str, html: str):
     """Send email using stored Google OAuth tokens"""
-    # Get stored tokens
-    token_doc = cosmos.get_by_id("oauthTokens", "user-google", partition="google")
-    if not token_doc:
+    # Cached token, refreshed (and saved back to Cosmos) before it expires
+    access_token = oauth_tokens.google.access_token()
+    if not access_token:
         raise Exception("Google OAuth not configured. Please authenticate first.")
     
-    creds = Credentials(
-        token=token_doc["accessToken"],
-        refresh_token=token_doc.get("refreshToken"),
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=token_doc.get("clientId"),
-        client_secret=token_doc.get("clientSecret")
-    )
+    creds = Credentials(token=access_token)
     
     service = build("gmail", "v1", credentials=creds)
     msg = email.message.EmailMessage()
@@ -0,0 +1,45 @@
+import hashlib, json, logging, datetime as dt
+from typing import List, Dict, Any, Optional
+from libs import cosmos
+from libs.schedule_matrix import GameMatrix
+
+# Own container (TTL on, partitioned by league) so entries expire and stay out of the run history
+CACHE_CONTAINER = "guidanceCache"
+CACHE_TTL_SECONDS = 14 * 24 * 3600
+
+def fingerprint(players: List[Dict[str, Any]], schedule: GameMatrix, league_settings: Dict[str, Any],
+                context: Optional[Dict[str, Any]] = None) -> str:
+    """Content hash of everything a team's guidance and email depend on.
+    
+    The schedule slice is the game/B2B pattern of the roster's NHL teams relative
+    to the window start, so a sliding window with the same games still matches.
+    context carries the remaining render inputs (week, team name, logo, season).
+    """
+    teams = sorted({p.get("nhl_team", "UNK") for p in players} - {"UNK"})
+    schedule_slice = {}
+    for team, row in zip(teams, schedule.rows(teams)):
+        if row >= 0:
+            schedule_slice[team] = [schedule.games[row].astype(int).tolist(), schedule.b2b[row].astype(int).tolist()]
+    
+    payload = {"players": players, "schedule": schedule_slice, "settings": league_settings, "context": context}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def lookup(league_id: str, key: str) -> Optional[Dict[str, Any]]:
+    """Cached guidance for a fingerprint: {"items", "tl_dr", "html"}, or None"""
+    doc = cosmos.get_by_id(CACHE_CONTAINER, f"gcache-{key}", partition=league_id)
+    return doc.get("entry") if doc else None
+
+def store(league_id: str, team_id: str, key: str, entry: Dict[str, Any]) -> None:
+    """Save an entry; a failed write only costs a cache miss next time"""
+    try:
+        cosmos.upsert(CACHE_CONTAINER, {
+            "id": f"gcache-{key}",
+            "docType": "guidanceCache",
+            "leagueId": league_id,
+            "teamId": team_id,
+            "createdAt": dt.datetime.utcnow().isoformat(),
+            "ttl": CACHE_TTL_SECONDS,
+            "entry": entry
+        }, partition=league_id)
+    except Exception as e:
+        logging.warning(f"Could not cache guidance for team {team_id} in league {league_id}: {str(e)}")
@@ -1,13 +1,22 @@
 
-import requests, datetime as dt
-from typing import List, Dict, Any, Optional
-from libs import cosmos
+import datetime as dt
+import bisect, hashlib, json, logging, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import numpy as np
+from libs import cosmos, cosmos_metrics, transport
+from libs.schedule_matrix import GameMatrix, back_to_backs
 
 API_WEB = "https://api-web.nhle.com/v1"
+PREFETCH_WORKERS = int(os.getenv("SCHEDULE_PREFETCH_WORKERS", "8"))
+# Cached schedules older than this are revalidated against the NHL API
+SCHEDULE_TTL_SECONDS = float(os.getenv("SCHEDULE_TTL_HOURS", "12")) * 3600
+# Version of the columnar encoding written to the schedules container
+SCHEDULE_FORMAT = 2
 
-# NHL team code mapping (Yahoo team names to NHL codes)
+# NHL team code mapping (Yahoo team names to NHL codes); Arizona relocated to Utah in 2024
 TEAM_MAPPING = {
-    "Anaheim Ducks": "ANA", "Arizona Coyotes": "ARI", "Boston Bruins": "BOS",
+    "Anaheim Ducks": "ANA", "Boston Bruins": "BOS",
     "Buffalo Sabres": "BUF", "Calgary Flames": "CGY", "Carolina Hurricanes": "CAR",
     "Chicago Blackhawks": "CHI", "Colorado Avalanche": "COL", "Columbus Blue Jackets": "CBJ",
     "Dallas Stars": "DAL", "Detroit Red Wings": "DET", "Edmonton Oilers": "EDM",
@@ -16,9 +25,11 @@ TEAM_MAPPING = {
     "New York Islanders": "NYI", "New York Rangers": "NYR", "Ottawa Senators": "OTT",
     "Philadelphia Flyers": "PHI", "Pittsburgh Penguins": "PIT", "San Jose Sharks": "SJS",
     "Seattle Kraken": "SEA", "St. Louis Blues": "STL", "Tampa Bay Lightning": "TBL",
-    "Toronto Maple Leafs": "TOR", "Vancouver Canucks": "VAN", "Vegas Golden Knights": "VGK",
+    "Toronto Maple Leafs": "TOR", "Utah Hockey Club": "UTA", "Utah Mammoth": "UTA",
+    "Vancouver Canucks": "VAN", "Vegas Golden Knights": "VGK",
     "Washington Capitals": "WSH", "Winnipeg Jets": "WPG"
 }
+NHL_TEAM_CODES = sorted(set(TEAM_MAPPING.values()))
 
 def season_code(today: dt.date) -> str:
     # ex: 20252026 for 2025-26
@@ -31,50 +42,375 @@ def map_team_to_code(team_name: str) -> Optional[str]:
     """Map Yahoo team name to NHL team code"""
     return TEAM_MAPPING.get(team_name)
 
-def cache_schedule(team_code: str, season: str) -> None:
-    """Cache team schedule in Cosmos DB"""
+def _now() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc)
+
+def _fetched_epoch(schedule_doc: Dict[str, Any]) -> float:
+    fetched_at = schedule_doc.get("fetchedAt")
+    return dt.datetime.fromisoformat(fetched_at).timestamp() if fetched_at else 0.0
+
+def _is_stale(schedule_doc: Dict[str, Any]) -> bool:
+    return _now().timestamp() - _fetched_epoch(schedule_doc) > SCHEDULE_TTL_SECONDS
+
+def _game_date(game: Dict[str, Any]) -> dt.date:
+    return dt.datetime.fromisoformat(game["gameDate"].replace("Z", "+00:00")).date()
+
+def encode_schedule(games: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Encode NHL API games as compact columns, keeping only what guidance reads.
+    
+    Dates are day offsets from startDate and teams are indexes into a code table:
+    {"format": 2, "startDate": "2025-10-07", "teams": ["BOS", ...],
+     "gameIds": [...], "days": [...], "home": [...], "away": [...]}
+    """
+    parsed = sorted(((_game_date(g), g) for g in games), key=lambda x: x[0])
+    start = parsed[0][0] if parsed else None
+    teams: List[str] = []
+    team_ids: Dict[str, int] = {}
+    
+    def _team_id(team: Dict[str, Any]) -> int:
+        abbrev = (team or {}).get("abbrev", "")
+        if abbrev not in team_ids:
+            team_ids[abbrev] = len(teams)
+            teams.append(abbrev)
+        return team_ids[abbrev]
+    
+    return {
+        "format": SCHEDULE_FORMAT,
+        "startDate": start.isoformat() if start else None,
+        "teams": teams,
+        "gameIds": [g.get("id", g.get("gameId")) for _, g in parsed],
+        "days": [(d - start).days for d, _ in parsed],
+        "home": [_team_id(g.get("homeTeam")) for _, g in parsed],
+        "away": [_team_id(g.get("awayTeam")) for _, g in parsed]
+    }
+
+def decode_schedule(schedule_doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Games of a schedules document in either the compact or the legacy raw format"""
+    if schedule_doc.get("format") != SCHEDULE_FORMAT:
+        return schedule_doc.get("games", [])
+    
+    if not schedule_doc["gameIds"]:
+        return []
+    start = dt.date.fromisoformat(schedule_doc["startDate"])
+    teams = schedule_doc["teams"]
+    return [{
+        "gameId": game_id,
+        "gameDate": (start + dt.timedelta(days=day)).isoformat(),
+        "homeTeam": {"abbrev": teams[home]},
+        "awayTeam": {"abbrev": teams[away]}
+    } for game_id, day, home, away in zip(schedule_doc["gameIds"], schedule_doc["days"],
+                                           schedule_doc["home"], schedule_doc["away"])]
+
+def _content_hash(columns: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(columns, sort_keys=True).encode()).hexdigest()
+
+def _download_schedule(team_code: str, season: str,
+                       cached: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Download a club schedule from the NHL API as a schedules document.
+    
+    With a cached document its ETag/Last-Modified are sent as validators and
+    None is returned when the API answers 304 Not Modified.
+    """
     url = f"{API_WEB}/club-schedule-season/{team_code}/{season}"
-    data = requests.get(url, timeout=15).json()
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("lastModified"):
+            headers["If-Modified-Since"] = cached["lastModified"]
+    
+    response = transport.get(url, headers=headers)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    columns = encode_schedule(response.json().get("games", []))
     
-    schedule_doc = {
+    return {
         "id": f"sched-{team_code}-{season}",
         "season": season,
         "teamCode": team_code,
-        "games": data.get("games", [])
+        **columns,
+        "etag": response.headers.get("ETag"),
+        "lastModified": response.headers.get("Last-Modified"),
+        "contentHash": _content_hash(columns),
+        "fetchedAt": _now().isoformat()
     }
+
+CHANGED = ("new", "updated")
+
+def _revalidate(team_code: str, season: str,
+                cached: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """Conditionally re-download a schedule; returns (status, document).
     
+    When status is in CHANGED the document is the full new schedule to write.
+    Otherwise it holds only the validators to record on the stored document
+    (fetchedAt, plus the new etag/lastModified when the body was re-sent).
+    """
+    schedule_doc = _download_schedule(team_code, season, cached)
+    if schedule_doc is None:
+        return "not-modified", {"fetchedAt": _now().isoformat()}
+    if not cached:
+        return "new", schedule_doc
+    if schedule_doc["contentHash"] == cached.get("contentHash"):
+        return "unchanged", {key: schedule_doc[key] for key in ("etag", "lastModified", "fetchedAt")}
+    return "updated", schedule_doc
+
+def _mark_fresh(team_code: str, season: str, validators: Dict[str, Any]) -> None:
+    """Record a revalidation on the stored document with a patch of just its validators"""
+    cosmos.patch("schedules", f"sched-{team_code}-{season}", season, validators)
+
+def cache_schedule(team_code: str, season: str) -> Dict[str, Any]:
+    """Cache team schedule in Cosmos DB"""
+    schedule_doc = _download_schedule(team_code, season)
     cosmos.upsert("schedules", schedule_doc, partition=season)
+    return schedule_doc
+
+def prefetch_schedules(season: str, team_codes: Optional[List[str]] = None, force: bool = False,
+                       max_workers: int = PREFETCH_WORKERS) -> Dict[str, Dict[str, Any]]:
+    """Download, revalidate and cache club schedules for a season in parallel.
+    
+    Missing teams are downloaded. Cached teams are revalidated with conditional
+    requests once older than SCHEDULE_TTL_HOURS (always when force is set). New
+    or changed schedules are written in one batch; unchanged ones only get their
+    fetchedAt/validators patched so other processes also see them as fresh.
+    Returns per-team status, download/write seconds and game count, or the error.
+    """
+    codes = team_codes or NHL_TEAM_CODES
+    cached = {doc["teamCode"]: doc for doc in cosmos.query(
+        "schedules",
+        "SELECT c.teamCode, c.etag, c.lastModified, c.contentHash, c.fetchedAt FROM c WHERE c.season = @season",
+        [{"name": "@season", "value": season}])}
+    codes = [code for code in codes if force or code not in cached or _is_stale(cached[code])]
+    
+    timings: Dict[str, Dict[str, Any]] = {}
+    if not codes:
+        return timings
+    
+    def _timed(fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, round(time.perf_counter() - started, 3)
+    
+    def _check(code):
+        status, doc = _revalidate(code, season, cached.get(code))
+        if status not in CHANGED:
+            _mark_fresh(code, season, doc)
+        return status, doc
+    
+    docs = []
+    fresh = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        downloads = {cosmos_metrics.submit(pool, _timed, _check, code): code for code in codes}
+        for future in as_completed(downloads):
+            code = downloads[future]
+            try:
+                (status, doc), seconds = future.result()
+                timings[code] = {"status": status, "downloadSeconds": seconds}
+                if status in CHANGED:
+                    docs.append(doc)
+                    timings[code]["games"] = len(doc["gameIds"])
+                else:
+                    fresh[code] = doc
+            except Exception as e:
+                timings[code] = {"error": str(e)}
+        
+    # Write every new or changed schedule as one transactional batch on the season partition
+    if docs:
+        started = time.perf_counter()
+        written = cosmos.bulk_upsert("schedules", [(doc, season) for doc in docs])
+        seconds = round(time.perf_counter() - started, 3)
+        for doc, result in zip(docs, written["results"]):
+            timings[doc["teamCode"]]["writeSeconds"] = seconds
+            if not result["ok"]:
+                timings[doc["teamCode"]]["error"] = result["error"]
+    
+    # Keep an already loaded index in step with what was just revalidated
+    index = _indexes.get(season)
+    if index is not None:
+        for doc in docs:
+            index.add_schedule(doc)
+        for code, validators in fresh.items():
+            index.touch(code, validators)
+        if docs:
+            # Rebuild the season matrix and its prefix sums now rather than on the next request
+            index.season_matrix()
+    
+    for code, timing in sorted(timings.items()):
+        logging.info(f"Schedule prefetch {code} {season}: {timing}")
+    return timings
+
+class ScheduleIndex:
+    """In-memory schedule for one season with pre-parsed, sorted game dates per team"""
+
+    def __init__(self, season: str):
+        self.season = season
+        # team code -> (sorted date ordinals, games in the same order)
+        self._teams: Dict[str, Tuple[List[int], List[Dict[str, Any]]]] = {}
+        # team code -> cache validators of the indexed document (etag, lastModified, contentHash, fetchedAt)
+        self._validators: Dict[str, Dict[str, Any]] = {}
+        # Whole-season team-by-day matrix, rebuilt lazily after any team changes
+        self._season_matrix: Optional[GameMatrix] = None
+
+    @classmethod
+    def load(cls, season: str) -> "ScheduleIndex":
+        """Build the index from every cached schedule document of the season"""
+        index = cls(season)
+        docs = cosmos.query("schedules", "SELECT * FROM c WHERE c.season = @season",
+                            [{"name": "@season", "value": season}])
+        for doc in docs:
+            index.add_schedule(doc)
+        return index
+
+    def add_schedule(self, schedule_doc: Dict[str, Any]) -> None:
+        """Index a schedules document, replacing any previous version of that team"""
+        team_code = schedule_doc["teamCode"]
+        self.add_team(team_code, decode_schedule(schedule_doc))
+        self._validators[team_code] = {key: schedule_doc.get(key)
+                                       for key in ("etag", "lastModified", "contentHash", "fetchedAt")}
+
+    def add_team(self, team_code: str, games: List[Dict[str, Any]]) -> None:
+        """Parse and sort a team's games once, flagging back-to-backs across the whole season"""
+        parsed = sorted(((_game_date(g).toordinal(), g) for g in games), key=lambda x: x[0])
+        ordinals = [o for o, _ in parsed]
+        team_games = []
+        for i, (o, game) in enumerate(parsed):
+            b2b = (i > 0 and o - ordinals[i - 1] == 1) or \
+                  (i + 1 < len(ordinals) and ordinals[i + 1] - o == 1)
+            team_games.append({**game, "backToBack": b2b})
+        self._teams[team_code] = (ordinals, team_games)
+        self._season_matrix = None
+
+    def touch(self, team_code: str, validators: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a team's schedule as just revalidated without changing its games.
+        
+        validators (fetchedAt and any new etag/lastModified) replace the indexed ones.
+        """
+        current = self._validators.setdefault(team_code, {})
+        current.update(validators or {"fetchedAt": _now().isoformat()})
+
+    def is_stale(self, team_code: str) -> bool:
+        return _is_stale(self._validators.get(team_code, {}))
+
+    def validators(self, team_code: str) -> Dict[str, Any]:
+        return dict(self._validators.get(team_code, {}))
+
+    def has_team(self, team_code: str) -> bool:
+        return team_code in self._teams
+
+    def teams(self) -> List[str]:
+        return list(self._teams)
+
+    def games(self, team_code: str, start: dt.date, end: dt.date) -> List[Dict[str, Any]]:
+        """Games for a team between start and end (inclusive) via binary search"""
+        if team_code not in self._teams:
+            return []
+        ordinals, games = self._teams[team_code]
+        lo = bisect.bisect_left(ordinals, start.toordinal())
+        hi = bisect.bisect_right(ordinals, end.toordinal())
+        return games[lo:hi]
+
+    def matrix(self, start: dt.date, end: dt.date) -> GameMatrix:
+        """Team-by-day game and back-to-back matrices for start..end (inclusive)"""
+        return self.season_matrix().window(start, end)
+
+    def season_matrix(self) -> GameMatrix:
+        """Whole-season matrix with its prefix sums, for O(1) date-range game counts"""
+        season_matrix = self._season_matrix
+        if season_matrix is None:
+            season_matrix = self._build_season_matrix()
+            season_matrix.prefix_sums()
+            self._season_matrix = season_matrix
+        return season_matrix
+
+    def games_between(self, team_code: str, start: dt.date, end: dt.date) -> Tuple[int, int]:
+        """(games, B2B games) a team plays between start and end (inclusive)"""
+        season_matrix = self.season_matrix()
+        row = season_matrix.row(team_code)
+        if row is None:
+            return 0, 0
+        games, b2b = season_matrix.counts(start, end, row)
+        return int(games), int(b2b)
+
+    def _build_season_matrix(self) -> GameMatrix:
+        teams = sorted(set(NHL_TEAM_CODES) | set(self._teams))
+        schedules = dict(self._teams)
+        all_ordinals = [o for ordinals, _ in schedules.values() for o in ordinals]
+        first = min(all_ordinals, default=dt.date.today().toordinal())
+        last = max(all_ordinals, default=first - 1)
+        
+        games = np.zeros((len(teams), last - first + 1), dtype=bool)
+        for row, team in enumerate(teams):
+            if team in schedules:
+                games[row, np.asarray(schedules[team][0], dtype=np.intp) - first] = True
+        return GameMatrix(teams, dt.date.fromordinal(first), games, back_to_backs(games))
+
+_indexes: Dict[str, ScheduleIndex] = {}
+_index_lock = threading.Lock()
+_refresh_pool = ThreadPoolExecutor(max_workers=4)
+_refreshing: set = set()
+
+def get_schedule_index(season: str) -> ScheduleIndex:
+    """Process-wide schedule index, loaded from Cosmos once per season"""
+    with _index_lock:
+        index = _indexes.get(season)
+        if index is None:
+            index = ScheduleIndex.load(season)
+            _indexes[season] = index
+        return index
+
+def _refresh_in_background(index: ScheduleIndex, team_code: str) -> None:
+    """Revalidate a stale team schedule off the request path (at most one refresh per team)"""
+    key = (index.season, team_code)
+    with _index_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    
+    def _refresh():
+        try:
+            status, schedule_doc = _revalidate(team_code, index.season, index.validators(team_code))
+            if status in CHANGED:
+                cosmos.upsert("schedules", schedule_doc, partition=index.season)
+                index.add_schedule(schedule_doc)
+            else:
+                _mark_fresh(team_code, index.season, schedule_doc)
+                index.touch(team_code, schedule_doc)
+            logging.info(f"Schedule refresh {team_code} {index.season}: {status}")
+        except Exception as e:
+            logging.warning(f"Schedule refresh failed for {team_code} {index.season}: {str(e)}")
+        finally:
+            with _index_lock:
+                _refreshing.discard(key)
+    
+    cosmos_metrics.submit(_refresh_pool, _refresh)
+
+def _ensure_team(index: ScheduleIndex, team_code: str) -> None:
+    """Cache a team missing from the index, or start revalidating it when stale"""
+    if not index.has_team(team_code):
+        try:
+            index.add_schedule(cache_schedule(team_code, index.season))
+        except Exception as e:
+            # Remember the miss until the TTL runs out instead of retrying on every lookup
+            logging.warning(f"Could not cache schedule for {team_code} {index.season}: {str(e)}")
+            index.add_team(team_code, [])
+            index.touch(team_code)
+    elif index.is_stale(team_code):
+        # Serve the cached games while the schedule is revalidated in the background
+        _refresh_in_background(index, team_code)
 
 def fetch_schedule(nhl_team_code: str, start: dt.date, end: dt.date) -> List[Dict[str, Any]]:
     """Fetch and filter team schedule for date range with B2B detection"""
-    season = season_code(start)
-    
-    # Try to get from cache first
-    cached = cosmos.get_by_id("schedules", f"sched-{nhl_team_code}-{season}", partition=season)
-    if cached:
-        games = cached.get("games", [])
-    else:
-        # Cache if not found
-        cache_schedule(nhl_team_code, season)
-        cached = cosmos.get_by_id("schedules", f"sched-{nhl_team_code}-{season}", partition=season)
-        games = cached.get("games", []) if cached else []
-    
-    # Filter to date range and add B2B flags
-    filtered_games = []
-    for game in games:
-        game_date = dt.datetime.fromisoformat(game["gameDate"].replace("Z", "+00:00")).date()
-        if start <= game_date <= end:
-            # Add B2B flag (simplified: check if previous game was within 24 hours)
-            b2b = False
-            if filtered_games:
-                prev_game_date = dt.datetime.fromisoformat(filtered_games[-1]["gameDate"].replace("Z", "+00:00")).date()
-                if (game_date - prev_game_date).days == 1:
-                    b2b = True
-                    # Mark previous game as B2B too
-                    if filtered_games:
-                        filtered_games[-1]["backToBack"] = True
-            
-            game["backToBack"] = b2b
-            filtered_games.append(game)
-    
-    return filtered_games
+    index = get_schedule_index(season_code(start))
+    _ensure_team(index, nhl_team_code)
+    return index.games(nhl_team_code, start, end)
+
+def season_schedule(season: str) -> GameMatrix:
+    """Whole-season team-by-day matrix with precomputed prefix sums"""
+    return get_schedule_index(season).season_matrix()
+
+def schedule_matrix(start: dt.date, end: dt.date, team_codes: Iterable[str] = ()) -> GameMatrix:
+    """Team-by-day game/B2B matrices for start..end, caching any of team_codes not indexed yet"""
+    index = get_schedule_index(season_code(start))
+    for team_code in set(team_codes) - {"UNK"}:
+        _ensure_team(index, team_code)
+    return index.matrix(start, end)
@@ -0,0 +1,108 @@
+"""Cached OAuth access tokens for Yahoo and Google, refreshed before they expire.
+
+Tokens live in the oauthTokens container with an absolute `expiresAt` (epoch
+seconds). A TokenManager keeps the current token in memory, so API calls need
+neither a Cosmos read nor an OAuth round trip while it is valid. Within
+REFRESH_MARGIN_SECONDS of expiry one caller refreshes it (others wait for that
+refresh instead of starting their own) and writes it back with an etag check;
+if another instance refreshed first, its token is used instead.
+"""
+from typing import Any, Dict, Optional
+import logging, os, threading, time
+from libs import cosmos, transport
+
+CONTAINER = "oauthTokens"
+# Refresh this long before expiry so no request goes out with a token about to lapse
+REFRESH_MARGIN_SECONDS = int(os.getenv("OAUTH_REFRESH_MARGIN_SECONDS", "300"))
+DEFAULT_EXPIRES_IN = 3600
+
+PROVIDERS = {
+    "yahoo": {"id": "user-yahoo", "token_uri": "https://api.login.yahoo.com/oauth2/get_token",
+              "client_id": "YAHOO_CLIENT_ID", "client_secret": "YAHOO_CLIENT_SECRET"},
+    "google": {"id": "user-google", "token_uri": "https://oauth2.googleapis.com/token",
+               "client_id": "GOOGLE_CLIENT_ID", "client_secret": "GOOGLE_CLIENT_SECRET"},
+}
+
+def token_doc(provider: str, tokens: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """oauthTokens document for a token endpoint response, with an absolute expiresAt"""
+    refresh_token = tokens.get("refresh_token") or (previous or {}).get("refreshToken")
+    return {
+        "id": PROVIDERS[provider]["id"],
+        "provider": provider,
+        "accessToken": tokens["access_token"],
+        "refreshToken": refresh_token,
+        "expiresAt": int(time.time()) + int(tokens.get("expires_in", DEFAULT_EXPIRES_IN)),
+    }
+
+def expires_at(doc: Dict[str, Any]) -> float:
+    """Absolute expiry of a stored token (older documents stored expires_in instead)"""
+    value = doc.get("expiresAt") or 0
+    if value < 10 ** 9:
+        # Seconds-from-issue, counted from the document's last write
+        return doc.get("_ts", 0) + value
+    return value
+
+class TokenManager:
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.config = PROVIDERS[provider]
+        self._doc: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _fresh(self, doc: Optional[Dict[str, Any]]) -> bool:
+        return bool(doc and doc.get("accessToken")) and expires_at(doc) - REFRESH_MARGIN_SECONDS > time.time()
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        doc = cosmos.get_by_id(CONTAINER, self.config["id"], partition=self.provider)
+        return dict(doc) if doc else None
+
+    def _refresh(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        response = transport.request("POST", self.config["token_uri"], data={
+            "grant_type": "refresh_token",
+            "refresh_token": doc["refreshToken"],
+            "client_id": os.getenv(self.config["client_id"]),
+            "client_secret": os.getenv(self.config["client_secret"]),
+        })
+        response.raise_for_status()
+        new_doc = token_doc(self.provider, response.json(), previous=doc)
+        try:
+            return dict(cosmos.replace_if_match(CONTAINER, new_doc, self.provider, doc.get("_etag")))
+        except cosmos.ConcurrencyConflict:
+            # Another instance refreshed at the same time; both tokens are valid, keep theirs
+            return self._load() or new_doc
+
+    def access_token(self, rejected: Optional[str] = None) -> Optional[str]:
+        """Current access token, or None if the provider was never authorized.
+        
+        Pass the token an API just answered 401 to as `rejected` to have it
+        replaced; concurrent callers rejecting the same token share one refresh.
+        """
+        doc = self._doc
+        if self._fresh(doc) and doc["accessToken"] != rejected:
+            return doc["accessToken"]
+        with self._lock:
+            # Whoever held the lock may have refreshed already
+            if self._fresh(self._doc) and self._doc["accessToken"] != rejected:
+                return self._doc["accessToken"]
+            doc = self._load()
+            if not doc:
+                self._doc = None
+                return None
+            stale = rejected is not None and doc.get("accessToken") == rejected
+            if (stale or not self._fresh(doc)) and doc.get("refreshToken"):
+                try:
+                    doc = self._refresh(doc)
+                except Exception as e:
+                    if expires_at(doc) <= time.time():
+                        raise Exception(f"{self.provider.title()} OAuth token expired and refresh failed: {str(e)}")
+                    logging.warning(f"{self.provider.title()} token refresh failed, using the current token: {str(e)}")
+            self._doc = doc
+            return doc.get("accessToken")
+
+    def invalidate(self) -> None:
+        """Drop the cached token, e.g. after an authorization change"""
+        with self._lock:
+            self._doc = None
+
+yahoo = TokenManager("yahoo")
+google = TokenManager("google")
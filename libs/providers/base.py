@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable
 
 class FantasyProvider(ABC):
     """Base interface for fantasy sports providers"""
@@ -18,3 +19,31 @@ class FantasyProvider(ABC):
     def roster(self, team_id: str, week: int) -> List[Dict[str, Any]]:
         """Get roster for a specific team and week"""
         pass
+    
+    def rosters(self, team_ids: Iterable[str], week: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get rosters for several teams (team_id -> players); override to batch requests"""
+        return {team_id: self.roster(team_id, week) for team_id in team_ids}
+
+class AsyncFantasyProvider(ABC):
+    """asyncio variant of FantasyProvider for concurrent league syncs"""
+    
+    @abstractmethod
+    async def current_week(self) -> int:
+        """Get the current week of the season"""
+        pass
+    
+    @abstractmethod
+    async def teams(self) -> List[Dict[str, Any]]:
+        """Get all teams in the league"""
+        pass
+    
+    @abstractmethod
+    async def roster(self, team_id: str, week: int) -> List[Dict[str, Any]]:
+        """Get roster for a specific team and week"""
+        pass
+    
+    async def rosters(self, team_ids: Iterable[str], week: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get rosters for several teams concurrently (team_id -> players)"""
+        team_ids = list(team_ids)
+        results = await asyncio.gather(*(self.roster(team_id, week) for team_id in team_ids))
+        return dict(zip(team_ids, results))
@@ -0,0 +1,154 @@
+"""Token-bucket rate limiting shared by every running function instance.
+
+The bucket for an API lives in one document in the leases container. An
+instance leases a few tokens at a time with an etag-guarded read-modify-write,
+hands them out locally, and comes back for more when they run out, so the
+combined request rate of all instances stays within the budget. A Retry-After
+from the API blocks the bucket for everyone. If Cosmos is unavailable the
+limiter falls back to a process-local bucket with the same budget.
+"""
+from typing import Dict, Optional
+import logging, math, os, random, threading, time
+from libs import cosmos
+
+LEASE_CONTAINER = "leases"
+# Tokens taken from the shared bucket per Cosmos round trip
+LEASE_SIZE = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "5"))
+# Longest a caller waits for a token before giving up
+MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120"))
+CAS_ATTEMPTS = 5
+# After the shared bucket fails, stay on the local bucket this long before retrying it
+FALLBACK_SECONDS = 60
+
+class RateLimitTimeout(Exception):
+    """No token became available within MAX_WAIT_SECONDS"""
+
+class TokenBucket:
+    """Process-local bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_take(self) -> float:
+        """Take a token; returns 0, or the seconds to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def penalize(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+class SharedTokenBucket:
+    """Token bucket whose state is a lease document shared across instances"""
+
+    def __init__(self, name: str, rate: float, burst: int, lease_size: int = LEASE_SIZE):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.lease_size = max(1, min(lease_size, burst))
+        self.doc_id = f"ratelimit-{name}"
+        self.local = TokenBucket(rate, burst)
+        self._leased = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._fallback_until = 0.0
+
+    def _state(self, doc: Optional[Dict], now: float) -> Dict:
+        """Bucket document refilled up to `now` (wall clock, shared by all instances)"""
+        if not doc:
+            return {"id": self.doc_id, "tokens": float(self.burst), "updatedAt": now, "blockedUntil": 0.0}
+        elapsed = max(0.0, now - doc.get("updatedAt", now))
+        return {"id": self.doc_id, "tokens": min(self.burst, doc.get("tokens", 0.0) + elapsed * self.rate),
+                "updatedAt": now, "blockedUntil": doc.get("blockedUntil", 0.0)}
+
+    def _lease(self) -> float:
+        """Move tokens from the shared bucket to this process; returns 0 or seconds to wait"""
+        for _ in range(CAS_ATTEMPTS):
+            doc = cosmos.get_by_id(LEASE_CONTAINER, self.doc_id, partition=self.name)
+            now = time.time()
+            state = self._state(doc, now)
+            if state["blockedUntil"] > now:
+                with self._lock:
+                    self._blocked_until = time.monotonic() + state["blockedUntil"] - now
+                return state["blockedUntil"] - now
+            take = min(self.lease_size, math.floor(state["tokens"]))
+            if take < 1:
+                return (1 - state["tokens"]) / self.rate
+            state["tokens"] -= take
+            try:
+                cosmos.replace_if_match(LEASE_CONTAINER, state, self.name, doc.get("_etag") if doc else None)
+            except cosmos.ConcurrencyConflict:
+                continue
+            with self._lock:
+                self._leased += take
+            return 0.0
+        # Heavy contention: back off briefly before re-reading
+        return random.uniform(0.05, 0.25)
+
+    def _take(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                return self._blocked_until - now
+            if self._leased > 0:
+                self._leased -= 1
+                return 0.0
+            local_only = self._fallback_until > now
+        if local_only:
+            return self.local.try_take()
+        try:
+            wait = self._lease()
+        except Exception as e:
+            logging.warning(f"Shared rate limit '{self.name}' unavailable, using a local bucket: {str(e)}")
+            with self._lock:
+                self._fallback_until = time.monotonic() + FALLBACK_SECONDS
+            return self.local.try_take()
+        if wait == 0.0:
+            return self._take()
+        return wait
+
+    def acquire(self, max_wait: float = MAX_WAIT_SECONDS) -> None:
+        """Block until a request may be sent"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Rate limit '{self.name}': no token within {max_wait:.0f}s")
+            time.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        """Stop all instances for `seconds` (the API answered 429/Retry-After)"""
+        self.local.penalize(seconds)
+        with self._lock:
+            self._leased = 0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        try:
+            for _ in range(CAS_ATTEMPTS):
+                doc = cosmos.get_by_id(LEASE_CONTAINER, self.doc_id, partition=self.name)
+                now = time.time()
+                state = self._state(doc, now)
+                state["tokens"] = 0.0
+                state["blockedUntil"] = max(state["blockedUntil"], now + seconds)
+                try:
+                    cosmos.replace_if_match(LEASE_CONTAINER, state, self.name, doc.get("_etag") if doc else None)
+                    return
+                except cosmos.ConcurrencyConflict:
+                    continue
+        except Exception as e:
+            logging.warning(f"Could not share rate limit backoff for '{self.name}': {str(e)}")
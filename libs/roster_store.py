@@ -0,0 +1,80 @@
+"""Weekly roster documents, partitioned by league.
+
+Documents are `roster-{leagueId}-{teamId}-{week}` in the league's partition, so team
+ids that repeat across leagues never collide and a whole league's week is one
+single-partition query. Older documents (`roster-{teamId}-{week}` partitioned by
+team) are moved over with `python -m libs.roster_store [--dry-run]`.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import sys
+from libs import cosmos
+
+CONTAINER = "rosters"
+
+def roster_id(league_id: str, team_id: str, week: int) -> str:
+    return f"roster-{league_id}-{team_id}-{week}"
+
+def roster_doc(league_id: str, team_id: str, week: int, players: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+    """(document, partition) pair for cosmos.bulk_upsert"""
+    return {
+        "id": roster_id(league_id, team_id, week),
+        "leagueId": league_id,
+        "teamId": team_id,
+        "week": int(week),
+        "players": players
+    }, league_id
+
+def save_league_rosters(league_id: str, week: int, rosters: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Store one week of rosters for a league (team_id -> players); returns the bulk_upsert result"""
+    return cosmos.bulk_upsert(CONTAINER, [roster_doc(league_id, team_id, week, players)
+                                          for team_id, players in rosters.items()])
+
+def get_roster(league_id: str, team_id: str, week: int) -> Optional[Dict[str, Any]]:
+    return cosmos.get_by_id(CONTAINER, roster_id(league_id, team_id, week), partition=league_id)
+
+def load_league_rosters(league_id: str, week: int) -> Dict[str, List[Dict[str, Any]]]:
+    """All rosters of a league for a week (team_id -> players) in one single-partition query"""
+    docs = cosmos.query(CONTAINER, "SELECT c.teamId, c.players FROM c WHERE c.week = @week",
+                        [{"name": "@week", "value": int(week)}], partition=league_id)
+    return {doc["teamId"]: doc.get("players", []) for doc in docs}
+
+def _legacy_docs() -> Iterable[Dict[str, Any]]:
+    # Pre-league-partitioning documents live in a partition named after the team
+    for doc in cosmos.query_iter(CONTAINER, "SELECT * FROM c"):
+        if doc.get("partitionKey") != doc.get("leagueId"):
+            yield doc
+
+def migrate_legacy(dry_run: bool = False) -> Dict[str, Any]:
+    """Rewrite team-partitioned roster documents into their league partition and delete the originals.
+
+    Safe to re-run: documents already in their league partition are skipped, and an
+    original is only deleted after its copy was written.
+    """
+    moved, skipped, failed = [], [], []
+    legacy = []
+    for doc in _legacy_docs():
+        if not doc.get("leagueId") or not doc.get("teamId") or doc.get("week") is None:
+            skipped.append(doc["id"])
+        else:
+            legacy.append(doc)
+
+    if not dry_run and legacy:
+        copies = [roster_doc(doc["leagueId"], doc["teamId"], doc["week"], doc.get("players", [])) for doc in legacy]
+        written = cosmos.bulk_upsert(CONTAINER, copies)
+        for doc, result in zip(legacy, written["results"]):
+            if not result["ok"]:
+                failed.append(doc["id"])
+                continue
+            try:
+                cosmos.delete(CONTAINER, doc["id"], partition=doc["partitionKey"])
+                moved.append(doc["id"])
+            except Exception:
+                failed.append(doc["id"])
+    else:
+        moved = [doc["id"] for doc in legacy]
+
+    return {"dryRun": dry_run, "moved": len(moved), "skipped": skipped, "failed": failed}
+
+if __name__ == "__main__":
+    # python -m libs.roster_store [--dry-run]  (with COSMOS_ENDPOINT/COSMOS_KEY set)
+    print(migrate_legacy(dry_run="--dry-run" in sys.argv[1:]))
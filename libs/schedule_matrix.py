@@ -0,0 +1,94 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import datetime as dt
+import numpy as np
+
+class GameMatrix:
+    """Team-by-day game grid for a date window.
+    
+    games[row, day] is True when teams[row] plays on start + day; b2b marks the
+    games that are part of a back-to-back for that team.
+    """
+
+    def __init__(self, teams: List[str], start: dt.date, games: np.ndarray, b2b: np.ndarray):
+        self.teams = list(teams)
+        self.start = start
+        self.games = games
+        self.b2b = b2b
+        self._rows = {team: row for row, team in enumerate(self.teams)}
+        # Cumulative games/B2B per team with a leading zero column, built on first count
+        self._prefix: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def days(self) -> int:
+        return self.games.shape[1]
+
+    @property
+    def end(self) -> dt.date:
+        return self.start + dt.timedelta(days=self.days - 1)
+
+    def dates(self) -> List[dt.date]:
+        return [self.start + dt.timedelta(days=i) for i in range(self.days)]
+
+    def row(self, team_code: str) -> Optional[int]:
+        return self._rows.get(team_code)
+
+    def rows(self, team_codes: Iterable[str]) -> np.ndarray:
+        """Row index per team code, -1 for teams not in the matrix"""
+        return np.array([self._rows.get(code, -1) for code in team_codes], dtype=np.intp)
+
+    def prefix_sums(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative games and B2B games per team, shape (teams, days + 1)"""
+        if self._prefix is None:
+            zeros = np.zeros((len(self.teams), 1), dtype=np.int32)
+            self._prefix = (np.hstack([zeros, np.cumsum(self.games, axis=1, dtype=np.int32)]),
+                            np.hstack([zeros, np.cumsum(self.b2b, axis=1, dtype=np.int32)]))
+        return self._prefix
+
+    def counts(self, start: dt.date, end: dt.date, rows=slice(None)) -> Tuple[np.ndarray, np.ndarray]:
+        """Games and B2B games for start..end (inclusive) per team row (all rows by default), O(1) per row"""
+        lo = min(max((start - self.start).days, 0), self.days)
+        hi = min(max((end - self.start).days + 1, lo), self.days)
+        cum_games, cum_b2b = self.prefix_sums()
+        return cum_games[rows, hi] - cum_games[rows, lo], cum_b2b[rows, hi] - cum_b2b[rows, lo]
+
+    def window(self, start: dt.date, end: dt.date) -> "GameMatrix":
+        """Sub-matrix for start..end (inclusive); days outside this matrix are empty"""
+        days = max((end - start).days + 1, 0)
+        games = np.zeros((len(self.teams), days), dtype=bool)
+        b2b = np.zeros((len(self.teams), days), dtype=bool)
+        offset = (start - self.start).days
+        lo, hi = max(offset, 0), min(offset + days, self.days)
+        if lo < hi:
+            games[:, lo - offset:hi - offset] = self.games[:, lo:hi]
+            b2b[:, lo - offset:hi - offset] = self.b2b[:, lo:hi]
+        return GameMatrix(self.teams, start, games, b2b)
+
+    @classmethod
+    def from_games(cls, games: List[Dict[str, Any]], start: Optional[dt.date] = None,
+                   end: Optional[dt.date] = None) -> "GameMatrix":
+        """Build a matrix from NHL game dicts; back-to-backs are derived from the games given"""
+        dated = [(dt.datetime.fromisoformat(g["gameDate"].replace("Z", "+00:00")).date(), g) for g in games]
+        if start is None:
+            start = min((d for d, _ in dated), default=dt.date.today())
+        if end is None:
+            end = max((d for d, _ in dated), default=start)
+        
+        teams = sorted({g.get(side, {}).get("abbrev") for _, g in dated for side in ("homeTeam", "awayTeam")} - {None})
+        rows = {team: row for row, team in enumerate(teams)}
+        grid = np.zeros((len(teams), max((end - start).days + 1, 0)), dtype=bool)
+        for game_date, game in dated:
+            day = (game_date - start).days
+            if 0 <= day < grid.shape[1]:
+                for side in ("homeTeam", "awayTeam"):
+                    abbrev = game.get(side, {}).get("abbrev")
+                    if abbrev in rows:
+                        grid[rows[abbrev], day] = True
+        return cls(teams, start, grid, back_to_backs(grid))
+
+def back_to_backs(games: np.ndarray) -> np.ndarray:
+    """Flag games played on consecutive days (both games of the pair)"""
+    b2b = np.zeros_like(games)
+    pairs = games[:, 1:] & games[:, :-1]
+    b2b[:, 1:] |= pairs
+    b2b[:, :-1] |= pairs
+    return b2b
@@ -0,0 +1,200 @@
+"""Shared HTTP transport for the Yahoo and NHL clients.
+
+One pooled requests.Session per host (keep-alive across calls and threads),
+default timeouts, and retries with jittered exponential backoff on connection
+errors, timeouts, 429 and 5xx (honoring Retry-After). Per-host counters are
+available from stats() for logging. A rate limiter registered for a host with
+set_limiter() is acquired before every attempt and told about Retry-After/429
+answers so it can slow all callers down. arequest() applies the same policy and
+counters to an httpx.AsyncClient from async_client() for asyncio callers.
+"""
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio, email.utils, os, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import AsyncRetrying, Retrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "20"))
+MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", "4"))
+# Longest Retry-After we are willing to sleep for inside a request
+MAX_RETRY_AFTER_SECONDS = 60
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Pause applied to a host's limiter on 429 without a Retry-After header
+DEFAULT_THROTTLE_SECONDS = 5
+
+class RetryableStatus(Exception):
+    """A 429/5xx answer; retried, and returned as-is once attempts run out"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+_sessions: Dict[str, requests.Session] = {}
+# host -> object with acquire() and penalize(seconds), e.g. rate_limit.SharedTokenBucket
+_limiters: Dict[str, Any] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+def session(host: str) -> requests.Session:
+    """Pooled session for a host (created on first use)"""
+    s = _sessions.get(host)
+    if s is None:
+        with _lock:
+            s = _sessions.get(host)
+            if s is None:
+                s = requests.Session()
+                # Retries are done here, not by urllib3
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _sessions[host] = s
+    return s
+
+def set_limiter(host: str, limiter: Any) -> None:
+    """Throttle every request to host through limiter (None removes it)"""
+    if limiter is None:
+        _limiters.pop(host, None)
+    else:
+        _limiters[host] = limiter
+
+def _throttle_for(response) -> Optional[float]:
+    """Seconds the server asked us to back off, if this answer is a throttle"""
+    retry_after = _retry_after(response)
+    if retry_after is not None and response.status_code in (429, 503):
+        return retry_after
+    return DEFAULT_THROTTLE_SECONDS if response.status_code == 429 else None
+
+def _count(host: str, **increments: float) -> None:
+    with _lock:
+        counters = _stats.setdefault(host, {"requests": 0, "errors": 0, "retries": 0,
+                                            "totalMs": 0.0, "maxMs": 0.0})
+        for key, value in increments.items():
+            if key == "maxMs":
+                counters[key] = max(counters[key], value)
+            else:
+                counters[key] += value
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Per-host counters: requests, errors, retries, totalMs, maxMs, avgMs"""
+    with _lock:
+        return {host: {**c, "avgMs": round(c["totalMs"] / c["requests"], 1) if c["requests"] else 0.0}
+                for host, c in _stats.items()}
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+_backoff = wait_random_exponential(multiplier=0.5, max=30)
+
+def _wait(retry_state) -> float:
+    error = retry_state.outcome.exception()
+    if isinstance(error, RetryableStatus):
+        retry_after = _retry_after(error.response)
+        if retry_after is not None:
+            return retry_after
+    return _backoff(retry_state)
+
+def _give_up(retry_state):
+    error = retry_state.outcome.exception()
+    if isinstance(error, RetryableStatus):
+        return error.response  # let the caller's raise_for_status() report it
+    raise error
+
+def request(method: str, url: str, timeout: Optional[Tuple[float, float]] = None,
+            max_attempts: int = MAX_ATTEMPTS, **kwargs: Any) -> requests.Response:
+    """Send a request through the host's pooled session, retrying transient failures"""
+    host = _host(url)
+    s = session(host)
+    limiter = _limiters.get(host)
+
+    def _attempt() -> requests.Response:
+        if limiter:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = s.request(method, url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+        except requests.RequestException:
+            elapsed = (time.perf_counter() - started) * 1000
+            _count(host, requests=1, errors=1, totalMs=elapsed, maxMs=elapsed)
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        failed = response.status_code in RETRY_STATUSES
+        _count(host, requests=1, errors=int(failed), totalMs=elapsed, maxMs=elapsed)
+        if failed:
+            throttle = _throttle_for(response) if limiter else None
+            if throttle:
+                limiter.penalize(throttle)
+            raise RetryableStatus(response)
+        return response
+
+    retrying = Retrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=_wait,
+        retry=retry_if_exception_type((RetryableStatus, requests.ConnectionError, requests.Timeout)),
+        before_sleep=lambda _: _count(host, retries=1),
+        retry_error_callback=_give_up,
+    )
+    return retrying(_attempt)
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def async_client():
+    """httpx.AsyncClient with the transport's timeouts; it pools connections per host.
+    
+    Create one per event loop (e.g. per asyncio.run) and close it when done.
+    """
+    import httpx
+    return httpx.AsyncClient(timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                             limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
+
+async def arequest(client, method: str, url: str, max_attempts: int = MAX_ATTEMPTS, **kwargs: Any):
+    """Async counterpart of request() over an httpx.AsyncClient"""
+    import httpx
+    host = _host(url)
+    limiter = _limiters.get(host)
+
+    async def _attempt():
+        if limiter:
+            # The limiter sleeps and talks to Cosmos synchronously; keep it off the event loop
+            await asyncio.to_thread(limiter.acquire)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            elapsed = (time.perf_counter() - started) * 1000
+            _count(host, requests=1, errors=1, totalMs=elapsed, maxMs=elapsed)
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        failed = response.status_code in RETRY_STATUSES
+        _count(host, requests=1, errors=int(failed), totalMs=elapsed, maxMs=elapsed)
+        if failed:
+            throttle = _throttle_for(response) if limiter else None
+            if throttle:
+                await asyncio.to_thread(limiter.penalize, throttle)
+            raise RetryableStatus(response)
+        return response
+
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=_wait,
+        retry=retry_if_exception_type((RetryableStatus, httpx.TransportError)),
+        before_sleep=lambda _: _count(host, retries=1),
+        retry_error_callback=_give_up,
+    )
+    return await retrying(_attempt)
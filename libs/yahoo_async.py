@@ -0,0 +1,89 @@
+"""asyncio Yahoo provider for syncing many leagues at once.
+
+fetch_leagues() pulls week, settings, teams and rosters for every league
+concurrently over one pooled httpx client; a shared semaphore caps the number of
+Yahoo requests in flight across all leagues and teams. sync_leagues() is the
+blocking entry point for timer/HTTP functions; single-league callers keep using
+the synchronous YahooClient.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio, os
+from libs import oauth_tokens, transport
+from libs.providers.base import AsyncFantasyProvider
+from libs.yahoo_client import (BASE_URL, auth_headers, parse_current_week, parse_league_settings, parse_roster,
+                               parse_rosters, parse_teams, roster_urls)
+
+# Yahoo requests in flight at once, across all leagues
+YAHOO_CONCURRENCY = int(os.getenv("YAHOO_CONCURRENCY", "8"))
+
+async def _access_token(rejected: Optional[str] = None) -> Optional[str]:
+    # May block on Cosmos and the token endpoint when a refresh is due; keep it off the event loop
+    return await asyncio.to_thread(oauth_tokens.yahoo.access_token, rejected)
+
+class AsyncYahooClient(AsyncFantasyProvider):
+    def __init__(self, league_id: str, client, semaphore: asyncio.Semaphore, access_token: Optional[str] = None):
+        self.league_id = league_id
+        self.client = client
+        self.semaphore = semaphore
+        self._access_token = access_token
+
+    async def _make_request(self, url: str) -> Dict[str, Any]:
+        """Make authenticated request to Yahoo API, bounded by the shared semaphore"""
+        if not self._access_token:
+            self._access_token = await _access_token()
+        if not self._access_token:
+            raise Exception("Yahoo OAuth not configured. Please authenticate first.")
+        access_token = self._access_token
+        async with self.semaphore:
+            response = await transport.arequest(self.client, "GET", url, headers=auth_headers(access_token))
+        if response.status_code == 401:
+            # Revoked or expired mid-run: refresh once (shared with other leagues) and retry
+            self._access_token = await _access_token(rejected=access_token)
+            async with self.semaphore:
+                response = await transport.arequest(self.client, "GET", url,
+                                                    headers=auth_headers(self._access_token))
+        response.raise_for_status()
+        return response.json()
+
+    async def current_week(self) -> int:
+        return parse_current_week(await self._make_request(f"{BASE_URL}/league/{self.league_id}"))
+
+    async def league_settings(self) -> Dict[str, Any]:
+        return parse_league_settings(await self._make_request(f"{BASE_URL}/league/{self.league_id}/settings"))
+
+    async def teams(self) -> List[Dict[str, Any]]:
+        return parse_teams(await self._make_request(f"{BASE_URL}/league/{self.league_id}/teams"))
+
+    async def roster(self, team_id: str, week: int) -> List[Dict[str, Any]]:
+        data = await self._make_request(f"{BASE_URL}/team/{self.league_id}.t.{team_id}/roster;week={week}")
+        return parse_roster(data["fantasy_content"]["team"])
+
+    async def rosters(self, team_ids: Iterable[str], week: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Rosters via teams;team_keys=... collections, chunks fetched concurrently"""
+        team_ids = [str(team_id) for team_id in team_ids]
+        pages = await asyncio.gather(*(self._make_request(url) for url in roster_urls(self.league_id, team_ids, week)))
+        rosters: Dict[str, List[Dict[str, Any]]] = {}
+        for data in pages:
+            rosters.update(parse_rosters(data))
+        return {team_id: rosters.get(team_id, []) for team_id in team_ids}
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Everything a league sync needs: {"week", "settings", "teams", "rosters"}"""
+        week, settings, teams = await asyncio.gather(self.current_week(), self.league_settings(), self.teams())
+        rosters = await self.rosters([team["team_id"] for team in teams], week)
+        return {"week": week, "settings": settings, "teams": teams, "rosters": rosters}
+
+async def fetch_leagues(league_ids: Iterable[str], concurrency: int = YAHOO_CONCURRENCY) -> Dict[str, Any]:
+    """league_id -> snapshot, or the exception that league failed with"""
+    league_ids = list(league_ids)
+    access_token = await _access_token()
+    semaphore = asyncio.Semaphore(concurrency)
+    async with transport.async_client() as client:
+        results = await asyncio.gather(
+            *(AsyncYahooClient(league_id, client, semaphore, access_token).snapshot() for league_id in league_ids),
+            return_exceptions=True)
+    return dict(zip(league_ids, results))
+
+def sync_leagues(league_ids: Iterable[str], concurrency: int = YAHOO_CONCURRENCY) -> Dict[str, Any]:
+    """Blocking wrapper around fetch_leagues() for synchronous functions"""
+    return asyncio.run(fetch_leagues(league_ids, concurrency))
@@ -1,104 +1,186 @@
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Optional
 import os
-import requests
 from libs.providers.base import FantasyProvider
-from libs import cosmos
+from libs import oauth_tokens, rate_limit, transport
+
+YAHOO_HOST = "fantasysports.yahooapis.com"
+BASE_URL = f"https://{YAHOO_HOST}/fantasy/v2"
+# Team keys per teams;team_keys=... collection request
+TEAMS_PER_REQUEST = int(os.getenv("YAHOO_TEAMS_PER_REQUEST", "15"))
+# Request budget for Yahoo shared by all function instances (nightly, sync, admin runs)
+YAHOO_REQUESTS_PER_MINUTE = float(os.getenv("YAHOO_REQUESTS_PER_MINUTE", "120"))
+YAHOO_BURST = int(os.getenv("YAHOO_BURST", "20"))
+# "shared" throttles through the leases container (needs `python -m libs.cosmos` once); "off" disables it
+YAHOO_RATE_LIMIT = os.getenv("YAHOO_RATE_LIMIT", "shared")
+_limiter = None
+
+def configure_rate_limit() -> None:
+    """Throttle Yahoo requests through the shared token bucket; called by functions that call Yahoo"""
+    global _limiter
+    if YAHOO_RATE_LIMIT != "shared" or _limiter is not None:
+        return
+    _limiter = rate_limit.SharedTokenBucket("yahoo", rate=YAHOO_REQUESTS_PER_MINUTE / 60, burst=YAHOO_BURST)
+    transport.set_limiter(YAHOO_HOST, _limiter)
+
+def auth_headers(access_token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {access_token}"}
+
+def _entries(collection) -> List[Any]:
+    """Items of a Yahoo collection, which comes as a list or as {"0": ..., "1": ..., "count": n}"""
+    if isinstance(collection, dict):
+        return [value for key, value in collection.items() if key != "count"]
+    return list(collection or [])
+
+def _merged(meta) -> Dict[str, Any]:
+    """Yahoo splits resource metadata into a list of single-key dicts; flatten it"""
+    if isinstance(meta, list):
+        merged = {}
+        for part in meta:
+            if isinstance(part, dict):
+                merged.update(part)
+        return merged
+    return meta
 
 class YahooClient(FantasyProvider):
     def __init__(self, league_id: str):
         self.league_id = league_id
-        self._access_token = None
-        self._refresh_token = None
-        self._load_tokens()
-    
-    def _load_tokens(self):
-        """Load OAuth tokens from Cosmos DB"""
-        token_doc = cosmos.get_by_id("oauthTokens", "user-yahoo", partition="yahoo")
-        if token_doc:
-            self._access_token = token_doc.get("accessToken")
-            self._refresh_token = token_doc.get("refreshToken")
     
-    def _get_auth_headers(self) -> Dict[str, str]:
-        """Get authorization headers for Yahoo API"""
-        if not self._access_token:
+    def _access_token(self, rejected: Optional[str] = None) -> str:
+        """Yahoo access token (cached and refreshed by oauth_tokens)"""
+        access_token = oauth_tokens.yahoo.access_token(rejected=rejected)
+        if not access_token:
             raise Exception("Yahoo OAuth not configured. Please authenticate first.")
-        return {"Authorization": f"Bearer {self._access_token}"}
+        return access_token
     
     def _make_request(self, url: str) -> Dict[str, Any]:
         """Make authenticated request to Yahoo API"""
-        headers = self._get_auth_headers()
-        response = requests.get(url, headers=headers)
+        access_token = self._access_token()
+        response = transport.get(url, headers=auth_headers(access_token))
+        if response.status_code == 401:
+            # Revoked or expired early: refresh once and retry
+            response = transport.get(url, headers=auth_headers(self._access_token(rejected=access_token)))
         response.raise_for_status()
         return response.json()
     
     def current_week(self) -> int:
         """Get current week of the season"""
-        url = f"https://fantasysports.yahooapis.com/fantasy/v2/league/{self.league_id}"
-        data = self._make_request(url)
-        league = data["fantasy_content"]["league"][0]
-        return int(league["current_week"])
+        return parse_current_week(self._make_request(f"{BASE_URL}/league/{self.league_id}"))
     
     def league_settings(self) -> Dict[str, Any]:
         """Get league scoring settings and rules"""
-        url = f"https://fantasysports.yahooapis.com/fantasy/v2/league/{self.league_id}/settings"
-        data = self._make_request(url)
-        settings = data["fantasy_content"]["league"][1]["settings"]
-        
-        # Extract scoring settings
-        scoring_settings = {}
-        for setting in settings:
-            if setting.get("name") == "scoring_type":
-                scoring_settings["type"] = setting.get("value")
-            elif setting.get("name") == "scoring_settings":
-                scoring_settings["categories"] = setting.get("value", {})
-        
-        return scoring_settings
+        return parse_league_settings(self._make_request(f"{BASE_URL}/league/{self.league_id}/settings"))
     
     def teams(self) -> List[Dict[str, Any]]:
         """Get all teams in the league"""
-        url = f"https://fantasysports.yahooapis.com/fantasy/v2/league/{self.league_id}/teams"
-        data = self._make_request(url)
-        teams = []
-        for team_data in data["fantasy_content"]["league"][1]["teams"]:
-            if "team" in team_data:
-                team = team_data["team"][0]
-                teams.append({
-                    "team_id": team["team_id"],
-                    "name": team["name"],
-                    "manager": team.get("managers", [{}])[0].get("manager", {}).get("nickname", "")
-                })
-        return teams
+        return parse_teams(self._make_request(f"{BASE_URL}/league/{self.league_id}/teams"))
     
     def roster(self, team_id: str, week: int) -> List[Dict[str, Any]]:
         """Get roster for a specific team and week"""
-        url = f"https://fantasysports.yahooapis.com/fantasy/v2/team/{self.league_id}.t.{team_id}/roster;week={week}"
+        url = f"{BASE_URL}/team/{self.league_id}.t.{team_id}/roster;week={week}"
         data = self._make_request(url)
-        roster = []
-        
-        if "roster" in data["fantasy_content"]["team"][1]:
-            for player_data in data["fantasy_content"]["team"][1]["roster"]["0"]["players"]:
-                if "player" in player_data:
-                    player = player_data["player"][0]
-                    # Extract NHL team code from eligible positions or player details
-                    nhl_team = self._extract_nhl_team(player)
-                    roster.append({
-                        "player_id": player["player_id"],
-                        "name": player["name"]["full"],
-                        "position": player["display_position"],
-                        "nhl_team": nhl_team,
-                        "status": player.get("status", "active")
-                    })
-        return roster
+        return parse_roster(data["fantasy_content"]["team"])
+    
+    def rosters(self, team_ids: Iterable[str], week: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get rosters for many teams with one teams;team_keys=... request per TEAMS_PER_REQUEST teams"""
+        team_ids = [str(team_id) for team_id in team_ids]
+        rosters: Dict[str, List[Dict[str, Any]]] = {}
+        for url in roster_urls(self.league_id, team_ids, week):
+            rosters.update(parse_rosters(self._make_request(url)))
+        # Teams missing from the collection response have empty rosters, as with roster()
+        return {team_id: rosters.get(team_id, []) for team_id in team_ids}
+
+# Response parsing, shared with the async client (libs/yahoo_async.py)
+
+def roster_urls(league_id: str, team_ids: List[str], week: int) -> List[str]:
+    """teams;team_keys=... collection URLs covering team_ids, TEAMS_PER_REQUEST at a time"""
+    urls = []
+    for i in range(0, len(team_ids), TEAMS_PER_REQUEST):
+        keys = ",".join(f"{league_id}.t.{team_id}" for team_id in team_ids[i:i + TEAMS_PER_REQUEST])
+        urls.append(f"{BASE_URL}/teams;team_keys={keys}/roster;week={week}")
+    return urls
+
+def parse_current_week(data: Dict[str, Any]) -> int:
+    league = data["fantasy_content"]["league"][0]
+    return int(league["current_week"])
+
+def parse_league_settings(data: Dict[str, Any]) -> Dict[str, Any]:
+    league = data["fantasy_content"]["league"][0]
+    settings = data["fantasy_content"]["league"][1]["settings"]
+    
+    # Season calendar, used to map fantasy weeks to dates
+    scoring_settings = {}
+    for key, field in (("startDate", "start_date"), ("endDate", "end_date")):
+        if league.get(field):
+            scoring_settings[key] = league[field]
+    for key, field in (("startWeek", "start_week"), ("endWeek", "end_week")):
+        if league.get(field):
+            scoring_settings[key] = int(league[field])
+    
+    # Extract scoring settings
+    for setting in settings:
+        if setting.get("name") == "scoring_type":
+            scoring_settings["type"] = setting.get("value")
+        elif setting.get("name") == "scoring_settings":
+            scoring_settings["categories"] = setting.get("value", {})
+        elif "roster_positions" in setting:
+            # Lineup slot counts, e.g. {"C": 2, "LW": 2, "RW": 2, "D": 4, "Util": 1, "G": 2, "BN": 4}
+            scoring_settings["rosterPositions"] = {
+                rp["roster_position"]["position"]: int(rp["roster_position"].get("count", 1))
+                for rp in setting["roster_positions"] if "roster_position" in rp
+            }
+        if setting.get("playoff_start_week"):
+            scoring_settings["playoffStartWeek"] = int(setting["playoff_start_week"])
+    
+    return scoring_settings
+
+def parse_teams(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    teams = []
+    for team_data in data["fantasy_content"]["league"][1]["teams"]:
+        if "team" in team_data:
+            team = team_data["team"][0]
+            teams.append({
+                "team_id": team["team_id"],
+                "name": team["name"],
+                "manager": team.get("managers", [{}])[0].get("manager", {}).get("nickname", "")
+            })
+    return teams
+
+def parse_rosters(data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """team_id -> players from a teams;team_keys=.../roster collection response"""
+    rosters = {}
+    for entry in _entries(data["fantasy_content"]["teams"]):
+        if isinstance(entry, dict) and "team" in entry:
+            team_id = str(_merged(entry["team"][0]).get("team_id", ""))
+            rosters[team_id] = parse_roster(entry["team"])
+    return rosters
+
+def parse_roster(team: List[Any]) -> List[Dict[str, Any]]:
+    """Players of a team resource ([metadata, {"roster": ...}])"""
+    roster = []
+    if len(team) > 1 and "roster" in team[1]:
+        for player_data in _entries(team[1]["roster"]["0"]["players"]):
+            if isinstance(player_data, dict) and "player" in player_data:
+                player = _merged(player_data["player"][0])
+                # Extract NHL team code from eligible positions or player details
+                nhl_team = _extract_nhl_team(player)
+                roster.append({
+                    "player_id": player["player_id"],
+                    "name": player["name"]["full"],
+                    "position": player["display_position"],
+                    "nhl_team": nhl_team,
+                    "status": player.get("status", "active")
+                })
+    return roster
+
+def _extract_nhl_team(player: Dict[str, Any]) -> str:
+    """Extract NHL team code from player data"""
+    # Try to get team from eligible positions
+    if "eligible_positions" in player:
+        for pos in player["eligible_positions"]:
+            if "position" in pos and "team" in pos["position"]:
+                return pos["position"]["team"]
     
-    def _extract_nhl_team(self, player: Dict[str, Any]) -> str:
-        """Extract NHL team code from player data"""
-        # Try to get team from eligible positions
-        if "eligible_positions" in player:
-            for pos in player["eligible_positions"]:
-                if "position" in pos and "team" in pos["position"]:
-                    return pos["position"]["team"]
-        
-        # Fallback: try to extract from player name or other fields
-        # This is a simplified mapping - in practice you'd want a more robust solution
-        return "UNK"  # Unknown team
+    # Fallback: try to extract from player name or other fields
+    # This is a simplified mapping - in practice you'd want a more robust solution
+    return "UNK"  # Unknown team
@@ -0,0 +1,6 @@
+"""Tests run against the in-memory Cosmos backend; nothing talks to Azure."""
+import os, sys
+
+os.environ.setdefault("COSMOS_BACKEND", "memory")
+os.environ.setdefault("YAHOO_RATE_LIMIT", "off")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import datetime as dt
+import json
+import pytest
+
+func = pytest.importorskip("azure.functions")
+pytest.importorskip("jinja2")
+pytest.importorskip("reportlab")
+pytest.importorskip("openai")
+
+from libs import cosmos, nhl_client, roster_store, yahoo_client
+
+LEAGUE = "nhl.l.1"
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, games):
+        self._games = games
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"games": self._games}
+
+def _games(team_code):
+    today = dt.date.today()
+    return [{"id": hash((team_code, day)) % 10 ** 6, "gameDate": (today + dt.timedelta(days=day)).isoformat(),
+             "homeTeam": {"abbrev": team_code}, "awayTeam": {"abbrev": "MTL"}} for day in (0, 2, 3)]
+
+@pytest.fixture
+def league(monkeypatch):
+    monkeypatch.setattr(nhl_client.transport, "get",
+                        lambda url, headers=None: _Response(_games(url.split("/")[-2])))
+    monkeypatch.setattr(yahoo_client.YahooClient, "teams",
+                        lambda self: [{"team_id": "1", "name": "Ice"}, {"team_id": "2", "name": "Fire"}])
+    cosmos.upsert("leagues", {"id": f"league-{LEAGUE}", "leagueId": LEAGUE, "settings": {}}, partition=LEAGUE)
+    for team_id in ("1", "2"):
+        cosmos.upsert("managers", {"id": f"mgr-{team_id}", "leagueId": LEAGUE, "teamId": team_id,
+                                   "name": f"Manager {team_id}", "email": f"m{team_id}@example.com"},
+                      partition=LEAGUE)
+    roster_store.save_league_rosters(LEAGUE, 1, {
+        "1": [{"player_id": "a", "name": "Alpha", "position": "C", "nhl_team": "TOR", "status": "active"},
+              {"player_id": "b", "name": "Bravo", "position": "C", "nhl_team": "UNK", "status": "active"}],
+        "2": [{"player_id": "c", "name": "Charlie", "position": "D", "nhl_team": "BOS", "status": "active"}],
+    })
+
+def _request(body):
+    return func.HttpRequest(method="POST", url="/api/admin/reports/generate", body=json.dumps(body).encode(),
+                            headers={"x-ms-client-principal-roles": "admin"})
+
+def test_generates_a_report_per_team(league):
+    from functions.admin_generate_reports import main
+
+    response = main(_request({"leagueId": LEAGUE, "week": 1}))
+
+    assert response.status_code == 200, response.get_body()
+    result = json.loads(response.get_body())
+    assert (result["totalTeams"], result["generatedReports"], result["failedReports"]) == (2, 2, 0)
+    report = cosmos.get_by_id("reports", result["reportId"], partition=LEAGUE)
+    html = report["htmlContent"]
+    assert "Ice" in html and "Fire" in html
+    assert "Schedule Outlook" in html
+    assert "Alpha" in html and "TOR" in html
+
+def test_requires_league(league):
+    from functions.admin_generate_reports import main
+
+    assert main(_request({"week": 1})).status_code == 400
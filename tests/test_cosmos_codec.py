@@ -0,0 +1,21 @@
+import json
+from libs.cosmos_codec import LazyDoc, encode_fields, is_encoded
+
+BODY = "<p>" + "x" * 4000 + "</p>"
+
+def _doc():
+    stored = encode_fields("reports", {"id": "report-1", "htmlContent": BODY})
+    assert is_encoded(stored["htmlContent"])
+    return LazyDoc(stored)
+
+def test_mutating_accessors_decode():
+    assert _doc().pop("htmlContent") == BODY
+    assert _doc().setdefault("htmlContent", "") == BODY
+    doc = _doc()
+    doc.pop("id")
+    assert doc.popitem() == ("htmlContent", BODY)
+
+def test_to_dict_is_plain_and_decoded():
+    exported = _doc().to_dict()
+    assert type(exported) is dict
+    assert json.loads(json.dumps(exported))["htmlContent"] == BODY
@@ -0,0 +1,20 @@
+from libs import cosmos
+
+def test_read_cache_is_scoped_to_the_block():
+    cosmos.upsert("leagues", {"id": "league-rc", "name": "before"}, partition="rc")
+    with cosmos.read_cache() as cache:
+        assert cosmos.get_by_id("leagues", "league-rc", partition="rc")["name"] == "before"
+        assert cosmos.get_by_id("leagues", "league-rc", partition="rc")["name"] == "before"
+        assert (cache.hits, cache.misses) == (1, 1)
+        # Our own writes invalidate the entry
+        cosmos.upsert("leagues", {"id": "league-rc", "name": "after"}, partition="rc")
+        assert cosmos.get_by_id("leagues", "league-rc", partition="rc")["name"] == "after"
+    assert cosmos.read_cache_stats() is None
+
+def test_blocks_do_not_share_entries():
+    cosmos.upsert("leagues", {"id": "league-rc2", "name": "x"}, partition="rc")
+    with cosmos.read_cache():
+        cosmos.get_by_id("leagues", "league-rc2", partition="rc")
+    with cosmos.read_cache() as cache:
+        cosmos.get_by_id("leagues", "league-rc2", partition="rc")
+        assert cache.hits == 0
@@ -0,0 +1,65 @@
+import datetime as dt
+import random
+from collections import defaultdict
+
+from engine.guidance import compute_guidance, compute_league_guidance
+from libs.schedule_matrix import GameMatrix
+
+TEAMS = ["BOS", "TOR", "MTL", "NYR", "EDM", "CGY"]
+POSITIONS = ["C", "LW", "RW", "D", "G"]
+
+def _schedule(rng):
+    start = dt.date(2025, 10, 6)
+    games = []
+    for day in range(7):
+        playing = rng.sample(TEAMS, 4)
+        for home, away in (playing[:2], playing[2:]):
+            games.append({"id": len(games), "gameDate": (start + dt.timedelta(days=day)).isoformat(),
+                          "homeTeam": {"abbrev": home}, "awayTeam": {"abbrev": away}})
+    return games
+
+def _roster(rng, prefix):
+    return [{"name": f"{prefix}{i}", "position": rng.choice(POSITIONS),
+             "nhl_team": rng.choice(TEAMS + ["UNK", "XXX"]), "status": rng.choice(["active", "active", "IR"])}
+            for i in range(14)]
+
+def _reference_start_bench(roster, games):
+    """(playerIn, playerOut) pairs as the original per-position loop produced them"""
+    by_position = defaultdict(list)
+    for player in roster:
+        if player.get("status") == "active":
+            by_position[player.get("position", "UNKNOWN")].append(player)
+    pairs = []
+    for players in by_position.values():
+        counts = [(p["name"], sum(1 for g in games if p["nhl_team"] in (g["homeTeam"]["abbrev"], g["awayTeam"]["abbrev"])))
+                  for p in players if p.get("nhl_team", "UNK") != "UNK"]
+        counts.sort(key=lambda x: x[1], reverse=True)
+        pairs += [(a[0], b[0]) for a, b in zip(counts, counts[1:]) if a[1] > b[1]]
+    return pairs
+
+def _start_bench(items):
+    return [(item["playerIn"], item["playerOut"]) for item in items if item["type"] == "start_bench"]
+
+def test_matches_the_per_position_loop():
+    rng = random.Random(3)
+    for _ in range(20):
+        games = _schedule(rng)
+        roster = _roster(rng, "p")
+        assert _start_bench(compute_guidance(roster, games, {}, {}, "20252026", "20242025")) == \
+            _reference_start_bench(roster, games)
+
+def test_league_pass_equals_one_call_per_team():
+    rng = random.Random(5)
+    games = _schedule(rng)
+    schedule = GameMatrix.from_games(games)
+    rosters = {team: _roster(rng, f"t{team}p") for team in range(6)}
+    league = compute_league_guidance(rosters, schedule, "20252026", "20242025")
+    for team, roster in rosters.items():
+        assert league[team] == compute_guidance(roster, schedule, {}, {}, "20252026", "20242025")
+
+def test_empty_schedule_returns_no_items():
+    roster = [{"name": "x", "position": "C", "nhl_team": "BOS", "status": "active"},
+              {"name": "y", "position": "C", "nhl_team": "TOR", "status": "active"}]
+    assert compute_guidance(roster, [], {}, {}, "a", "b") == []
+    assert compute_guidance(roster[:1], [], {}, {}, "a", "b") == []
+    assert compute_guidance([], [], {}, {}, "a", "b") == []
@@ -0,0 +1,38 @@
+import json
+import pytest
+
+func = pytest.importorskip("azure.functions")
+
+from libs import cosmos, nhl_client, roster_store
+
+LEAGUE = "nhl.l.2"
+
+def _offline(team_code, season):
+    raise OSError("no network in tests")
+
+@pytest.fixture
+def league(monkeypatch):
+    # No NHL downloads: roster teams are indexed as having no games
+    monkeypatch.setattr(nhl_client, "cache_schedule", _offline)
+    cosmos.upsert("leagues", {"id": f"league-{LEAGUE}", "leagueId": LEAGUE, "currentWeek": 7, "settings": {}},
+                  partition=LEAGUE)
+    roster_store.save_league_rosters(LEAGUE, 7, {
+        "1": [{"player_id": "a", "name": "Alpha", "position": "C", "nhl_team": "TOR", "status": "active"}],
+        "2": [{"player_id": "b", "name": "Bravo", "position": "C", "nhl_team": "BOS", "status": "active"}],
+    })
+
+def _analyze(body):
+    from functions.trade_analyzer import main
+    return main(func.HttpRequest(method="POST", url=f"/api/leagues/{LEAGUE}/trade", body=json.dumps(body).encode(),
+                                 route_params={"leagueId": LEAGUE}))
+
+def test_defaults_to_the_current_week(league):
+    response = _analyze({"teamA": "1", "teamB": "2", "give": ["a"], "get": ["b"]})
+    assert response.status_code == 200, response.get_body()
+    assert json.loads(response.get_body())["week"] == 7
+
+@pytest.mark.parametrize("body", [[], {"teamA": "1", "teamB": "2", "give": ["a"], "week": "two"},
+                                  {"teamA": "1", "teamB": "2", "give": ["a"], "week": 1.5},
+                                  {"teamA": "1", "teamB": "2", "give": ["a"], "weeks": "two"}])
+def test_rejects_malformed_bodies(league, body):
+    assert _analyze(body).status_code == 400